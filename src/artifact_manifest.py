@@ -0,0 +1,155 @@
+"""
+Artifact Manifest - Índice del último artefacto de cada tipo en ../outputs
+Evita recorrer y hacer stat() de miles de archivos con timestamp para encontrar el más reciente
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+OUTPUTS_DIR = Path("../outputs")
+CACHE_DIR = OUTPUTS_DIR / ".cache"
+MANIFEST_PATH = CACHE_DIR / "artifact_manifest.json"
+
+# Marca de tiempo en el nombre de los artefactos (YYYYMMDD_HHMMSS)
+TIMESTAMP_GLOB = '[0-9]' * 8 + '_' + '[0-9]' * 6
+
+# Writers del mismo proceso (p. ej. multi-formulario) actualizan el manifest de a uno
+_manifest_lock = threading.Lock()
+
+def file_sha1(path):
+    """Hash del contenido del archivo, leído por bloques"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifact_pattern(prefix, output_tag, extension):
+    """
+    Patrón glob de un tipo de artefacto, ej. ('FORM_COMPLETE', '111_', '.json')
+
+    Sin tag (un solo formulario) solo coincide con los nombres sin ID de formulario:
+    'FORM_COMPLETE_*.json' también tomaría los archivos de otros formularios.
+    """
+    return f"{prefix}_{output_tag}{TIMESTAMP_GLOB}{extension}"
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _write_manifest(manifest, manifest_path):
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = manifest_path.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    tmp_file.replace(manifest_path)
+
+def _entry(path, sha1=None):
+    stat = path.stat()
+    return {
+        'file': path.name,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': sha1 or file_sha1(path),
+        'recorded_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+def record_artifact(path, pattern, manifest_path=MANIFEST_PATH, sha1=None):
+    """
+    Registrar un artefacto recién escrito como el último de su tipo
+
+    Args:
+        path: Archivo escrito (dentro de ../outputs)
+        pattern: Patrón glob del tipo (artifact_pattern); solo se actualiza esa entrada
+        sha1: Hash ya calculado del contenido (opcional)
+
+    Returns:
+        sha1 del contenido
+    """
+    path = Path(path)
+    try:
+        entry = _entry(path, sha1)
+        with _manifest_lock:
+            manifest = _read_manifest(manifest_path)
+            manifest[pattern] = entry
+            _write_manifest(manifest, manifest_path)
+        return entry['sha1']
+    except OSError as e:
+        # El manifest es solo un índice: sin él se vuelve a recorrer el directorio
+        print(f"⚠️  No se pudo actualizar el manifest de artefactos: {e}")
+        return sha1
+
+def latest_artifact(pattern, outputs_dir=OUTPUTS_DIR, manifest_path=MANIFEST_PATH, external=False):
+    """
+    Último artefacto del tipo: (ruta, sha1) o (None, None)
+
+    Usa el manifest si su archivo sigue existiendo; si no, recorre el directorio una
+    vez (glob + stat) y deja el resultado registrado para las siguientes ejecuciones.
+
+    Args:
+        external: Tipo que llega de fuera (ej. SIMPLE_MAPPING, copiado a mano) y nunca pasa
+            por record_artifact: siempre se elige el más reciente por mtime; el manifest
+            solo evita recalcular el hash del archivo elegido
+    """
+    outputs_dir = Path(outputs_dir)
+
+    with _manifest_lock:
+        entry = _read_manifest(manifest_path).get(pattern)
+
+    if external:
+        candidates = list(outputs_dir.glob(pattern))
+        if not candidates:
+            return None, None
+        latest = max(candidates, key=lambda x: x.stat().st_mtime)
+        if entry is None or entry['file'] != latest.name:
+            return latest, record_artifact(latest, pattern, manifest_path, file_sha1(latest))
+    elif entry:
+        latest = outputs_dir / entry['file']
+    else:
+        latest = None
+
+    if latest is not None:
+        try:
+            stat = latest.stat()
+        except OSError:
+            stat = None
+
+        if stat is not None:
+            # Archivo reescrito en el lugar: recalcular solo su hash
+            if stat.st_size != entry['size'] or stat.st_mtime_ns != entry['mtime_ns']:
+                return latest, record_artifact(latest, pattern, manifest_path, file_sha1(latest))
+            return latest, entry['sha1']
+
+    candidates = list(outputs_dir.glob(pattern))
+    if not candidates:
+        return None, None
+
+    latest = max(candidates, key=lambda x: x.stat().st_mtime)
+    return latest, record_artifact(latest, pattern, manifest_path, file_sha1(latest))
+
+def load_compiled(name, source_sha1, cache_dir=CACHE_DIR):
+    """Resultado derivado de un archivo fuente, cacheado por el hash de la fuente (o None)"""
+    cache_file = Path(cache_dir) / f"{name}_{source_sha1}.json"
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def save_compiled(name, source_sha1, data, cache_dir=CACHE_DIR):
+    """Guardar el resultado derivado; reemplaza las versiones de fuentes anteriores"""
+    cache_dir = Path(cache_dir)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{name}_*.json"):
+            stale.unlink()
+        with open(cache_dir / f"{name}_{source_sha1}.json", 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️  No se pudo cachear {name}: {e}")
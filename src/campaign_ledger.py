@@ -0,0 +1,100 @@
+"""
+Campaign Ledger - Registro append-only (JSONL) de los resultados de una campaña
+Cada prefill y cada email se anota al momento; permite reanudar sin duplicar submissions
+Un archivo por campaña (ejecución): --resume reabre solo la campaña más reciente
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+LEDGER_DIR = Path("../outputs")
+
+def row_key(empresa, email):
+    """Clave estable de una fila de campaña: empresa + email normalizados"""
+    raw = f"{str(empresa).strip().lower()}|{str(email).strip().lower()}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class CampaignLedger:
+    """Write-ahead log de resultados por fila; la última entrada de cada clave es la vigente"""
+
+    def __init__(self, form_id, campaign_id, ledger_dir=LEDGER_DIR):
+        self.form_id = form_id
+        self.campaign_id = campaign_id
+        self.path = Path(ledger_dir) / f"CAMPAIGN_LEDGER_{form_id}_{campaign_id}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def start(cls, form_id, ledger_dir=LEDGER_DIR):
+        """Nueva campaña con su propio ledger (identificada por fecha y hora de inicio)"""
+        ledger = cls(form_id, datetime.now().strftime("%Y%m%d_%H%M%S"), ledger_dir)
+        # Crear el archivo de una vez: aunque se caiga antes del primer registro,
+        # --resume debe reabrir esta campaña y no una anterior
+        ledger.path.touch(exist_ok=True)
+        return ledger
+
+    @classmethod
+    def latest(cls, form_id, ledger_dir=LEDGER_DIR):
+        """Ledger de la campaña más reciente del formulario (None si no hay)"""
+        name_pattern = re.compile(rf"CAMPAIGN_LEDGER_{re.escape(str(form_id))}_(\d{{8}}_\d{{6}})\.jsonl")
+        campaign_ids = sorted(
+            match.group(1)
+            for match in (name_pattern.fullmatch(f.name) for f in Path(ledger_dir).glob(f"CAMPAIGN_LEDGER_{form_id}_*.jsonl"))
+            if match
+        )
+        return cls(form_id, campaign_ids[-1], ledger_dir) if campaign_ids else None
+
+    def load(self):
+        """Reconstruir el último resultado conocido de cada fila (clave -> result_entry)"""
+        entries = {}
+        if not self.path.exists():
+            return entries
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea truncada por una caída durante la escritura
+                    continue
+                entries[record['key']] = record['result']
+
+        return entries
+
+    def record(self, event, result_entry):
+        """Anotar el resultado de una fila ('prefill' o 'email') y forzarlo a disco"""
+        line = json.dumps({
+            'key': row_key(result_entry['empresa'], result_entry['email']),
+            'event': event,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'result': result_entry
+        }, ensure_ascii=False, default=str)
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @staticmethod
+    def is_complete(result_entry, send_emails):
+        """Fila terminada: prefill exitoso y, si hay envío, email enviado (o sin email)"""
+        if not result_entry.get('prefill_success'):
+            return False
+        if not send_emails or result_entry.get('email') == 'Sin email':
+            return True
+        return bool(result_entry.get('email_success'))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
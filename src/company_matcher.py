@@ -0,0 +1,181 @@
+"""
+Company Matcher - Índice de nombres de empresa para fuzzy matching rápido
+Indexa una sola vez, preselecciona candidatos por trigramas y puntúa solo esa lista corta
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+from fuzzywuzzy import fuzz, process, utils
+
+try:
+    from rapidfuzz import fuzz as rapid_fuzz
+    from rapidfuzz.process import cdist
+except ImportError:  # Sin rapidfuzz se usa el matching por consulta
+    cdist = None
+
+# Sufijos societarios que no aportan al matching (S.A.S., Ltda., S.A. E.S.P., ...)
+LEGAL_SUFFIXES = {
+    'sas', 'sa', 'ltda', 'limitada', 'eu', 'esp', 'sca', 'scs', 'bic',
+    'cia', 'y', 'inc', 'corp', 'sl', 'srl'
+}
+
+# Candidatos puntuados por consulta tras el blocking por trigramas
+MAX_CANDIDATES = 50
+
+# Matching en bloque: mínimo de consultas para usar cdist y celdas por bloque de la matriz
+BATCH_MIN_QUERIES = 50
+CDIST_MAX_CELLS = 5_000_000
+
+def normalize_company_name(name):
+    """Normalizar nombre: sin tildes, minúsculas, sin puntuación ni sufijos societarios"""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    tokens = re.sub(r'[^a-z0-9]+', ' ', text).split()
+
+    # Unir siglas separadas por puntos: "s a s" -> "sas"
+    merged = []
+    letters = []
+    for token in tokens + ['']:
+        if len(token) == 1 and token.isalpha():
+            letters.append(token)
+            continue
+        if letters:
+            merged.append(''.join(letters))
+            letters = []
+        if token:
+            merged.append(token)
+
+    # Quitar sufijos societarios al final del nombre (siempre dejar al menos un token)
+    while len(merged) > 1 and _is_legal_suffix(merged[-1]):
+        merged.pop()
+
+    return ' '.join(merged)
+
+def _is_legal_suffix(token):
+    """True si el token es uno o varios sufijos societarios pegados ("saesp" = S.A. E.S.P.)"""
+    if token in LEGAL_SUFFIXES:
+        return True
+    return any(
+        token.startswith(suffix) and _is_legal_suffix(token[len(suffix):])
+        for suffix in LEGAL_SUFFIXES if len(suffix) < len(token)
+    )
+
+def _trigrams(name):
+    """Trigramas del nombre tal como lo ve token_sort_ratio (procesado y con tokens ordenados)"""
+    tokens = sorted(utils.full_process(str(name), force_ascii=True).split())
+    padded = f"  {' '.join(tokens)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CompanyMatcher:
+    """Índice de empresas prefill para clasificar submissions con fuzzy matching"""
+
+    def __init__(self, company_names, threshold=75):
+        """
+        Args:
+            company_names: Nombres de empresas del registro de prefills
+            threshold: Score mínimo (token_sort_ratio) para considerar match
+        """
+        self.threshold = threshold
+        self.names = [name for name in company_names if isinstance(name, str) and name.strip()]
+
+        # Nombre normalizado -> posiciones (match exacto ignorando tildes, mayúsculas y sufijos)
+        self._normalized = defaultdict(list)
+        # Índice invertido trigrama -> posiciones de nombres
+        postings = defaultdict(list)
+        gram_counts = []
+        for position, name in enumerate(self.names):
+            self._normalized[normalize_company_name(name)].append(position)
+            grams = _trigrams(name)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(position)
+
+        self._postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+        self._gram_counts = np.array(gram_counts, dtype=np.float64)
+        self._cache = {}
+
+    def candidates(self, company_name):
+        """Posiciones de los nombres más similares a la consulta por trigramas (Dice)"""
+        positions = set(self._normalized.get(normalize_company_name(company_name), ()))
+
+        query_grams = _trigrams(company_name)
+        hits = [self._postings[gram] for gram in query_grams if gram in self._postings]
+
+        if hits:
+            shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+            dice = shared / (len(query_grams) + self._gram_counts)
+
+            limit = min(MAX_CANDIDATES, len(self.names))
+            top = np.argpartition(-dice, limit - 1)[:limit]
+            positions.update(int(position) for position in top if shared[position] > 0)
+
+        # Mantener el orden original para desempatar igual que process.extractOne
+        return sorted(positions)
+
+    def match(self, company_name):
+        """Retorna (nombre, score) del mejor match sobre el umbral, o None"""
+        if company_name in self._cache:
+            return self._cache[company_name]
+
+        shortlist = [self.names[position] for position in self.candidates(company_name)]
+        best_match = None
+
+        if shortlist:
+            best_match = process.extractOne(company_name, shortlist, scorer=fuzz.token_sort_ratio)
+
+        result = best_match if best_match and best_match[1] >= self.threshold else None
+        self._cache[company_name] = result
+
+        return result
+
+    def match_many(self, company_names):
+        """
+        Mejor match de cada nombre en una sola pasada vectorizada
+        
+        Returns:
+            (matched_names, scores): arrays alineados con company_names;
+            matched_names es None y score 0 donde no se supera el umbral
+        """
+        count = len(company_names)
+        matched_names = np.full(count, None, dtype=object)
+        scores = np.zeros(count, dtype=np.int64)
+
+        if not count or not self.names:
+            return matched_names, scores
+
+        # Entradas pequeñas (o sin rapidfuzz): matching por consulta con el índice
+        if cdist is None or count < BATCH_MIN_QUERIES:
+            for position, company_name in enumerate(company_names):
+                best_match = self.match(company_name)
+                if best_match:
+                    matched_names[position], scores[position] = best_match
+            return matched_names, scores
+
+        # Mismo preprocesamiento que fuzzywuzzy para obtener scores idénticos
+        choices = [utils.full_process(name, force_ascii=True) for name in self.names]
+        queries = [utils.full_process(str(name), force_ascii=True) for name in company_names]
+        names = np.array(self.names, dtype=object)
+
+        chunk_size = max(1, CDIST_MAX_CELLS // len(choices))
+        for start in range(0, count, chunk_size):
+            matrix = cdist(
+                queries[start:start + chunk_size],
+                choices,
+                scorer=rapid_fuzz.token_sort_ratio,
+                dtype=np.float32,
+                workers=-1
+            )
+            # Redondear antes de comparar (fuzzywuzzy compara scores enteros) y desempatar
+            # por la primera posición con el máximo, como process.extractOne
+            np.rint(matrix, out=matrix)
+            best = matrix.argmax(axis=1)
+            best_scores = matrix[np.arange(len(best)), best].astype(np.int64)
+
+            hit = best_scores >= self.threshold
+            matched_names[start:start + len(best)][hit] = names[best[hit]]
+            scores[start:start + len(best)][hit] = best_scores[hit]
+
+        return matched_names, scores
@@ -8,19 +8,79 @@ load_dotenv()
 JOTFORM_API_KEY = os.getenv('JOTFORM_API_KEY')
 FORM_ID = os.getenv('FORM_ID')
 
+# Multi-form mode: comma-separated form IDs (regional clones of the 5REC form), default FORM_ID
+FORM_IDS = [form_id.strip() for form_id in os.getenv('FORM_IDS', '').split(',') if form_id.strip()] or [FORM_ID]
+MULTI_FORM_WORKERS = int(os.getenv('MULTI_FORM_WORKERS', '4'))  # forms processed at the same time
+JOTFORM_BASE_URL = os.getenv('JOTFORM_BASE_URL', 'https://api.jotform.com')
+
 # Email Configuration
 GMAIL_USER = os.getenv('GMAIL_USER')
 GMAIL_PASSWORD = os.getenv('GMAIL_PASSWORD')
 SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
 SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))  # authenticated sessions kept open
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+
+# Email dispatch queue (independent of prefill creation)
+EMAIL_SEND_WORKERS = int(os.getenv('EMAIL_SEND_WORKERS', str(SMTP_POOL_SIZE)))
+EMAIL_SEND_RATE = float(os.getenv('EMAIL_SEND_RATE', '2'))  # emails/second, 0 = unlimited
+EMAIL_SEND_BURST = int(os.getenv('EMAIL_SEND_BURST', '2'))
 
 # Project Configuration
 PROJECT_NAME = os.getenv('PROJECT_NAME', '5REC')
 FROM_NAME = 'Equipo 5REC'
 
+# Concurrency Configuration
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', '5'))
+
+# JotForm API Rate Limiting (token bucket shared by all API callers)
+JOTFORM_RATE_LIMIT = float(os.getenv('JOTFORM_RATE_LIMIT', '2'))  # requests/second
+JOTFORM_RATE_BURST = int(os.getenv('JOTFORM_RATE_BURST', '5'))
+
+# HTTP connection pool shared by all JotForm API callers (keep-alive)
+JOTFORM_POOL_SIZE = int(os.getenv('JOTFORM_POOL_SIZE', str(max(10, MAX_CONCURRENT_REQUESTS))))
+
+# JotForm API retries (jittered exponential backoff) and circuit breaker
+JOTFORM_MAX_RETRIES = int(os.getenv('JOTFORM_MAX_RETRIES', '4'))
+JOTFORM_RETRY_BASE_DELAY = float(os.getenv('JOTFORM_RETRY_BASE_DELAY', '1'))  # seconds
+JOTFORM_RETRY_MAX_DELAY = float(os.getenv('JOTFORM_RETRY_MAX_DELAY', '30'))
+JOTFORM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('JOTFORM_CIRCUIT_FAILURE_THRESHOLD', '5'))  # consecutive failures
+JOTFORM_CIRCUIT_RESET_TIMEOUT = float(os.getenv('JOTFORM_CIRCUIT_RESET_TIMEOUT', '30'))  # seconds paused
+
+# Form structure (/form/{id}/questions) disk cache: seconds before revalidating with the API
+FORM_SCHEMA_CACHE_TTL = int(os.getenv('FORM_SCHEMA_CACHE_TTL', '3600'))
+
+# Form Monitor: submissions per API page (JotForm max is 1000)
+SUBMISSIONS_PAGE_SIZE = int(os.getenv('SUBMISSIONS_PAGE_SIZE', '1000'))
+
+# Form Monitor: incremental sync against a local SQLite store
+MONITOR_INCREMENTAL_SYNC = os.getenv('MONITOR_INCREMENTAL_SYNC', 'true').lower() == 'true'
+SUBMISSIONS_DB_PATH = os.getenv('SUBMISSIONS_DB_PATH', '../outputs/submissions_store.db')
+# Hours between full syncs that also drop submissions deleted in JotForm (0 = never)
+MONITOR_FULL_RECONCILE_HOURS = float(os.getenv('MONITOR_FULL_RECONCILE_HOURS', '24'))
+
+# Form Monitor: Parquet snapshots (long + wide) under ../outputs/snapshots (requires pyarrow)
+MONITOR_PARQUET_SNAPSHOTS = os.getenv('MONITOR_PARQUET_SNAPSHOTS', 'true').lower() == 'true'
+
+# Prefill Engine: local index organization -> submission (idempotent reruns)
+PREFILL_INDEX_DB_PATH = os.getenv('PREFILL_INDEX_DB_PATH', '../outputs/prefill_index.db')
+
+# Prefill Engine: rows per batch submission request (0 = one POST per row)
+PREFILL_BATCH_SIZE = int(os.getenv('PREFILL_BATCH_SIZE', '0'))
+
+# Input workbooks: cache sheets as Parquet under ../outputs/.cache (requires pyarrow)
+EXCEL_PARQUET_CACHE = os.getenv('EXCEL_PARQUET_CACHE', 'true').lower() == 'true'
+
+# Prefill Engine streaming mode (--chunk-size): rows read and processed per chunk
+EXCEL_CHUNK_SIZE = int(os.getenv('EXCEL_CHUNK_SIZE', '5000'))
+
 # Validate required environment variables
 required_vars = ['JOTFORM_API_KEY', 'FORM_ID', 'GMAIL_USER', 'GMAIL_PASSWORD']
 missing_vars = [var for var in required_vars if not os.getenv(var)]
 
 if missing_vars:
-    raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
\ No newline at end of file
+    raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+# Validate numeric settings that would stall or crash the API rate limiter
+if not JOTFORM_RATE_LIMIT > 0:
+    raise ValueError(f"JOTFORM_RATE_LIMIT must be greater than 0 (requests/second), got {JOTFORM_RATE_LIMIT}")
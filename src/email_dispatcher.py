@@ -0,0 +1,103 @@
+"""
+Email Dispatcher - Cola de envío de emails independiente de la creación de prefills
+Los prefills encolan sus edit URLs y un pool propio de workers SMTP las consume
+con su propia concurrencia y rate limit
+"""
+
+import queue
+import threading
+
+from config import EMAIL_SEND_WORKERS, EMAIL_SEND_RATE, EMAIL_SEND_BURST
+from rate_limiter import TokenBucketRateLimiter
+
+# Marca de fin de cola para cada worker
+_STOP = object()
+
+class EmailDispatcher:
+    """Pool de workers que envía emails encolados y anota el resultado en cada result_entry"""
+
+    def __init__(self, send_func, workers=EMAIL_SEND_WORKERS, rate=EMAIL_SEND_RATE, burst=EMAIL_SEND_BURST,
+                 on_result=None):
+        """
+        Args:
+            send_func: Función (to_email, empresa, edit_url, mapped_fields) -> {'success', 'error'}
+            workers: Envíos SMTP simultáneos
+            rate: Emails por segundo (0 = sin límite)
+            burst: Emails que se pueden enviar de golpe
+            on_result: Callback con el result_entry ya actualizado tras cada envío
+        """
+        self.send_func = send_func
+        self.on_result = on_result
+        self.rate_limiter = TokenBucketRateLimiter(rate, burst) if rate > 0 else None
+
+        self._queue = queue.Queue()
+        self.workers = max(1, workers)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"email-sender-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, result_entry, to_email, empresa, edit_url, mapped_fields):
+        """Encolar un email; el resultado se escribe en result_entry al enviarse"""
+        self._queue.put((result_entry, to_email, empresa, edit_url, mapped_fields))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                self._queue.task_done()
+                return
+
+            try:
+                self._send(*job)
+            except Exception as e:
+                # Un error inesperado no debe matar al worker: wait() esperaría para siempre
+                print(f"   ⚠️  Error en el envío de email: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _send(self, result_entry, to_email, empresa, edit_url, mapped_fields):
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+
+        try:
+            email_result = self.send_func(to_email, empresa, edit_url, mapped_fields)
+        except Exception as e:
+            email_result = {'success': False, 'error': str(e)}
+
+        result_entry['email_success'] = email_result['success']
+        result_entry['email_error'] = email_result.get('error')
+
+        if self.on_result:
+            try:
+                self.on_result(result_entry)
+            except Exception as e:
+                print(f"   ⚠️  Error registrando el resultado del email de {empresa}: {e}")
+
+        if email_result['success']:
+            print(f"   ✅ Email enviado: {empresa} <{to_email}>")
+        else:
+            print(f"   ❌ Error email {empresa} <{to_email}>: {email_result['error']}")
+
+    def wait(self):
+        """Esperar a que se envíen todos los emails encolados hasta ahora"""
+        self._queue.join()
+
+    def close(self):
+        """Esperar a que la cola se vacíe y detener los workers"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,130 @@
+"""
+Email Template - Mensaje de campaña 5REC preparado una sola vez por ejecución
+Las imágenes embebidas se leen y codifican una vez; el HTML se compila y solo se
+completan los campos de cada destinatario
+"""
+
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.mime.image import MIMEImage
+from pathlib import Path
+from string import Template
+
+IMG_DIR = Path("../img")
+
+# (archivo, Content-ID, nombre del adjunto inline)
+INLINE_IMAGES = [
+    ("5REC Franja.png", "header_image", "5REC_Franja.png"),
+    ("Imagen 5REC formulario.png", "button_image", "Imagen_5REC_formulario.png")
+]
+
+EMAIL_SUBJECT = Template("Formulario 5REC Pre-llenado - ${empresa}")
+
+EMAIL_HTML = Template("""
+<html>
+<head></head>
+<body>
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        
+        <!-- Header Image -->
+        <div style="text-align: center; margin-bottom: 20px;">
+            <img src="cid:header_image" style="width: 100%; max-width: 600px; height: auto; display: block; margin: 0 auto;" alt="5REC Header">
+        </div>
+        
+        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+            <h2 style="color: #2c5aa0; margin: 0;">🏢 Formulario 5REC</h2>
+            <p style="color: #666; margin: 5px 0 0 0;">Reporte Empresarial Consolidado</p>
+        </div>
+        
+        <div style="background-color: white; padding: 30px; border-radius: 10px; border: 1px solid #e9ecef;">
+            <h3 style="color: #333;">Estimado equipo de <strong>${empresa}</strong>,</h3>
+            
+            <p style="color: #666; line-height: 1.6;">
+                Hemos preparado su formulario 5REC con <strong>${mapped_fields} campos pre-llenados</strong> 
+                basados en la información que nos proporcionaron.
+            </p>
+            
+            <div style="background-color: #e7f3ff; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <p style="margin: 0; color: #0066cc;">
+                    <strong>🔗 Acceder al formulario:</strong>
+                </p>
+                <div style="text-align: center; margin: 15px 0;">
+                    <a href="${edit_url}" style="text-decoration: none; display: inline-block;">
+                        <img src="cid:button_image" style="max-width: 200px; height: auto; border: none;" alt="Acceder al Formulario 5REC">
+                    </a>
+                </div>
+                <div style="text-align: center; margin-top: 10px;">
+                    <a href="${edit_url}" 
+                       style="display: inline-block; background-color: #2c5aa0; color: white; 
+                              padding: 12px 25px; text-decoration: none; border-radius: 5px; 
+                              font-weight: bold;">
+                        ▶️ Abrir Formulario Pre-llenado
+                    </a>
+                </div>
+            </div>
+            
+            <div style="background-color: #f8f9fa; padding: 15px; border-radius: 8px; margin: 20px 0;">
+                <p style="margin: 0; color: #666; font-size: 14px;">
+                    <strong>📝 Instrucciones:</strong><br>
+                    • El formulario ya tiene información básica de su organización<br>
+                    • Complete los campos faltantes según corresponda<br>
+                    • Guarde y envíe cuando esté completo<br>
+                    • El enlace es único y personal para su organización
+                </p>
+            </div>
+            
+            <hr style="border: none; border-top: 1px solid #e9ecef; margin: 30px 0;">
+            
+            <p style="color: #666; font-size: 13px; text-align: center;">
+                <strong>Equipo 5REC</strong><br>
+                Este enlace es válido y puede ser usado para completar su reporte.<br>
+                Si tiene preguntas, no dude en contactarnos.
+            </p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+class CampaignEmailTemplate:
+    """Plantilla de email de campaña con imágenes CID ya codificadas"""
+
+    def __init__(self, from_name, from_email, img_dir=IMG_DIR):
+        self.sender = f"{from_name} <{from_email}>"
+        self.image_parts = self._load_image_parts(Path(img_dir))
+
+    @staticmethod
+    def _load_image_parts(img_dir):
+        """Leer y codificar (base64) las imágenes una sola vez; las faltantes se omiten"""
+        parts = []
+        for filename, content_id, attachment_name in INLINE_IMAGES:
+            img_path = img_dir / filename
+            if not img_path.exists():
+                continue
+
+            img = MIMEImage(img_path.read_bytes())
+            img.add_header('Content-ID', f'<{content_id}>')
+            img.add_header('Content-Disposition', 'inline', filename=attachment_name)
+            parts.append(img)
+
+        return parts
+
+    def build_message(self, to_email, empresa, edit_url, mapped_fields):
+        """Mensaje listo para enviar; solo el HTML y los headers cambian por destinatario"""
+        fields = {'empresa': empresa, 'edit_url': edit_url, 'mapped_fields': mapped_fields}
+
+        # Create message with related content for embedded images
+        message = MIMEMultipart("related")
+        message["Subject"] = EMAIL_SUBJECT.substitute(fields)
+        message["From"] = self.sender
+        message["To"] = to_email
+
+        msg_alternative = MIMEMultipart("alternative")
+        msg_alternative.attach(MIMEText(EMAIL_HTML.substitute(fields), "html"))
+        message.attach(msg_alternative)
+
+        # Las partes de imagen no se modifican al serializar: se comparten entre mensajes
+        for img in self.image_parts:
+            message.attach(img)
+
+        return message
@@ -3,17 +3,28 @@ Excel Generator - Generador de tabla Excel con links de prefill
 Sistema que reemplaza el envío de emails por generación de tabla Excel
 """
 
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import json
+from openpyxl.styles import Font, PatternFill, Alignment
+
+from excel_stream_writer import StreamingExcelWriter
+from artifact_manifest import artifact_pattern, record_artifact
+
+# Columnas de la tabla de links de prefill
+LINKS_COLUMNS = [
+    'N°', 'Empresa/Organización', 'Email Destinatario', 'Estado Prefill',
+    'Link de Prefill', 'Campos Mapeados', 'Observaciones', 'Fecha Procesamiento'
+]
 
 class ExcelPrefillGenerator:
     """Generador de tabla Excel con empresas, correos y links de prefill"""
     
-    def __init__(self):
+    def __init__(self, output_tag=""):
         self.results = []
         self.output_dir = Path("../outputs")
+        # Prefijo de los nombres de archivo (ID de formulario en modo multi-formulario)
+        self.output_tag = output_tag
         self.output_dir.mkdir(exist_ok=True)
     
     def generate_prefill_excel(self, results_data, form_id=None):
@@ -26,62 +37,28 @@ class ExcelPrefillGenerator:
         """
         print("📊 Generando tabla Excel con links de prefill...")
         
-        # Preparar datos para Excel
-        excel_data = []
-        
-        for idx, result in enumerate(results_data, 1):
-            empresa = result.get('empresa', f'Empresa_{idx}')
-            email = result.get('email', 'N/A')
-            prefill_success = result.get('prefill_success', False)
-            edit_url = result.get('edit_url', 'N/A')
-            mapped_fields = result.get('mapped_fields', 0)
-            prefill_error = result.get('prefill_error', '')
-            
-            # Determinar estado
-            if prefill_success:
-                estado = "✅ Prefill Exitoso"
-                observaciones = f"Campos mapeados: {mapped_fields}"
-            else:
-                estado = "❌ Error en Prefill"
-                observaciones = f"Error: {prefill_error}"
-            
-            excel_data.append({
-                'N°': idx,
-                'Empresa/Organización': empresa,
-                'Email Destinatario': email,
-                'Estado Prefill': estado,
-                'Link de Prefill': edit_url if prefill_success else 'N/A',
-                'Campos Mapeados': mapped_fields if prefill_success else 0,
-                'Observaciones': observaciones,
-                'Fecha Procesamiento': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            })
-        
-        # Crear DataFrame
-        df = pd.DataFrame(excel_data)
-        
         # Generar archivo Excel con formato
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"LINKS_PREFILL_{timestamp}.xlsx"
+        filename = f"LINKS_PREFILL_{self.output_tag}{timestamp}.xlsx"
         filepath = self.output_dir / filename
         
-        # Escribir Excel con formato mejorado
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        # Escribir Excel en streaming: formato definido antes de escribir las filas
+        with StreamingExcelWriter(filepath) as writer:
             # Hoja principal con datos
-            df.to_excel(writer, sheet_name='🔗 LINKS PREFILL', index=False)
-            
-            # Obtener workbook y worksheet para formateo
-            workbook = writer.book
-            worksheet = writer.sheets['🔗 LINKS PREFILL']
+            sheet = self._add_links_sheet(writer)
             
-            # Aplicar formato a las columnas
-            self._format_excel_worksheet(worksheet, len(df))
+            for idx, result in enumerate(results_data, 1):
+                sheet.append(self._build_link_row(idx, result))
             
             # Hoja de resumen
             self._create_summary_sheet(writer, results_data, form_id)
         
+        # Última tabla de links para el monitor, sin recorrer ../outputs
+        record_artifact(filepath, artifact_pattern("LINKS_PREFILL", self.output_tag, ".xlsx"))
+        
         print(f"✅ Tabla Excel generada: {filename}")
         print(f"   📁 Ubicación: {filepath}")
-        print(f"   📊 Total registros: {len(excel_data)}")
+        print(f"   📊 Total registros: {sheet.row_count}")
         
         # Mostrar estadísticas rápidas
         successful_prefills = len([r for r in results_data if r.get('prefill_success', False)])
@@ -90,48 +67,68 @@ class ExcelPrefillGenerator:
         
         return filepath
     
-    def _format_excel_worksheet(self, worksheet, row_count):
-        """Aplica formato a la hoja de Excel"""
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from openpyxl.utils import get_column_letter
+    def _build_link_row(self, idx, result):
+        """Fila de la tabla de links para un resultado del motor de prefill"""
+        empresa = result.get('empresa', f'Empresa_{idx}')
+        email = result.get('email', 'N/A')
+        prefill_success = result.get('prefill_success', False)
+        edit_url = result.get('edit_url', 'N/A')
+        mapped_fields = result.get('mapped_fields', 0)
+        prefill_error = result.get('prefill_error', '')
+        
+        # Determinar estado
+        if prefill_success:
+            estado = "✅ Prefill Exitoso"
+            observaciones = f"Campos mapeados: {mapped_fields}"
+        else:
+            estado = "❌ Error en Prefill"
+            observaciones = f"Error: {prefill_error}"
+        
+        return [
+            idx,
+            empresa,
+            email,
+            estado,
+            edit_url if prefill_success else 'N/A',
+            mapped_fields if prefill_success else 0,
+            observaciones,
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ]
+    
+    def _add_links_sheet(self, writer):
+        """Crea la hoja de links con encabezado, anchos y alineaciones definidos"""
+        sheet = writer.add_sheet(
+            '🔗 LINKS PREFILL',
+            column_widths={
+                'A': 8,   # N°
+                'B': 35,  # Empresa
+                'C': 30,  # Email
+                'D': 20,  # Estado
+                'E': 60,  # Link
+                'F': 15,  # Campos
+                'G': 40,  # Observaciones
+                'H': 20   # Fecha
+            },
+            freeze_panes='A2',  # Freeze panes en header
+            column_styles={
+                # Centrar columnas numéricas
+                0: {'alignment': Alignment(horizontal="center")},
+                5: {'alignment': Alignment(horizontal="center")},
+                7: {'alignment': Alignment(horizontal="center")},
+                # Wrap text para observaciones
+                6: {'alignment': Alignment(wrap_text=True)}
+            }
+        )
         
         # Formato del header
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="2C5AA0", end_color="2C5AA0", fill_type="solid")
-        
-        # Aplicar formato al header (fila 1)
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Ajustar ancho de columnas
-        column_widths = {
-            'A': 8,   # N°
-            'B': 35,  # Empresa
-            'C': 30,  # Email
-            'D': 20,  # Estado
-            'E': 60,  # Link
-            'F': 15,  # Campos
-            'G': 40,  # Observaciones
-            'H': 20   # Fecha
-        }
-        
-        for col_letter, width in column_widths.items():
-            worksheet.column_dimensions[col_letter].width = width
-        
-        # Formato para filas de datos
-        for row in range(2, row_count + 2):
-            # Centrar columnas numéricas
-            worksheet[f'A{row}'].alignment = Alignment(horizontal="center")
-            worksheet[f'F{row}'].alignment = Alignment(horizontal="center")
-            worksheet[f'H{row}'].alignment = Alignment(horizontal="center")
-            
-            # Wrap text para observaciones
-            worksheet[f'G{row}'].alignment = Alignment(wrap_text=True)
+        sheet.write_header(
+            LINKS_COLUMNS,
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill(start_color="2C5AA0", end_color="2C5AA0", fill_type="solid"),
+            alignment=Alignment(horizontal="center", vertical="center")
+        )
         
-        # Freeze panes en header
-        worksheet.freeze_panes = 'A2'
+        return sheet
     
     def _create_summary_sheet(self, writer, results_data, form_id):
         """Crea hoja de resumen con estadísticas"""
@@ -139,6 +136,10 @@ class ExcelPrefillGenerator:
         # Calcular estadísticas
         total_orgs = len(results_data)
         successful_prefills = len([r for r in results_data if r.get('prefill_success', False)])
+        self._write_summary_sheet(writer, form_id, total_orgs, successful_prefills)
+    
+    def _write_summary_sheet(self, writer, form_id, total_orgs, successful_prefills):
+        """Escribe la hoja de resumen a partir de los totales"""
         failed_prefills = total_orgs - successful_prefills
         success_rate = (successful_prefills / total_orgs * 100) if total_orgs > 0 else 0
         
@@ -161,30 +162,24 @@ class ExcelPrefillGenerator:
             ['4. Monitorear respuestas', 'Seguimiento a formularios completados']
         ]
         
-        # Crear DataFrame y escribir
-        summary_df = pd.DataFrame(summary_data, columns=['Campo', 'Información'])
-        summary_df.to_excel(writer, sheet_name='📋 RESUMEN', index=False)
-        
-        # Formatear hoja de resumen
-        summary_worksheet = writer.sheets['📋 RESUMEN']
-        
-        from openpyxl.styles import Font, PatternFill, Alignment
+        # Ajustar columnas
+        summary_sheet = writer.add_sheet('📋 RESUMEN', column_widths={'A': 30, 'B': 40})
         
         # Formato título
-        summary_worksheet['A1'].font = Font(bold=True, size=14, color="2C5AA0")
-        summary_worksheet.merge_cells('A1:B1')
-        
-        # Formato header de datos
-        summary_worksheet['A3'].font = Font(bold=True)
-        summary_worksheet['B3'].font = Font(bold=True)
-        
-        # Ajustar columnas
-        summary_worksheet.column_dimensions['A'].width = 30
-        summary_worksheet.column_dimensions['B'].width = 40
+        bold = {'font': Font(bold=True)}
+        title = {'font': Font(bold=True, size=14, color="2C5AA0")}
+        summary_sheet.append(['Campo', 'Información'], row_styles={0: title, 1: bold})
+        summary_sheet.merge_cells('A1:B1')
         
-        # Formato para sección de instrucciones
-        for row in range(11, 16):
-            summary_worksheet[f'A{row}'].font = Font(bold=True)
+        for row, values in enumerate(summary_data, 2):
+            if row == 3:
+                # Formato header de datos
+                summary_sheet.append(values, row_styles={0: bold, 1: bold})
+            elif 11 <= row <= 15:
+                # Formato para sección de instrucciones
+                summary_sheet.append(values, row_styles={0: bold})
+            else:
+                summary_sheet.append(values)
     
     def create_email_template(self, empresa, link_prefill, mapped_fields):
         """
@@ -223,7 +218,7 @@ Equipo 5REC
         """Genera archivo con templates de email para cada empresa"""
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"EMAIL_TEMPLATES_{timestamp}.txt"
+        filename = f"EMAIL_TEMPLATES_{self.output_tag}{timestamp}.txt"
         filepath = self.output_dir / filename
         
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -234,20 +229,82 @@ Equipo 5REC
             f.write(f"Total organizaciones: {len(results_data)}\n\n")
             
             for idx, result in enumerate(results_data, 1):
-                if result.get('prefill_success', False):
-                    empresa = result.get('empresa', f'Empresa_{idx}')
-                    email = result.get('email', 'N/A')
-                    link = result.get('edit_url', 'N/A')
-                    mapped_fields = result.get('mapped_fields', 0)
-                    
-                    f.write("-" * 80 + "\n")
-                    f.write(f"ORGANIZACIÓN {idx}: {empresa}\n")
-                    f.write(f"EMAIL: {email}\n")
-                    f.write("-" * 80 + "\n")
-                    
-                    template = self.create_email_template(empresa, link, mapped_fields)
-                    f.write(template)
-                    f.write("\n\n")
+                self._write_email_template(f, idx, result)
         
         print(f"✅ Templates de email generados: {filename}")
-        return filepath
\ No newline at end of file
+        return filepath
+    
+    def _write_email_template(self, f, idx, result):
+        """Escribe el template de una organización (solo prefills exitosos)"""
+        if not result.get('prefill_success', False):
+            return
+        
+        empresa = result.get('empresa', f'Empresa_{idx}')
+        email = result.get('email', 'N/A')
+        link = result.get('edit_url', 'N/A')
+        mapped_fields = result.get('mapped_fields', 0)
+        
+        f.write("-" * 80 + "\n")
+        f.write(f"ORGANIZACIÓN {idx}: {empresa}\n")
+        f.write(f"EMAIL: {email}\n")
+        f.write("-" * 80 + "\n")
+        
+        template = self.create_email_template(empresa, link, mapped_fields)
+        f.write(template)
+        f.write("\n\n")
+    
+    def open_prefill_stream(self, form_id=None):
+        """Salidas (tabla de links + templates) escritas por bloques; ver PrefillOutputStream"""
+        return PrefillOutputStream(self, form_id)
+
+class PrefillOutputStream:
+    """
+    Tabla de links y templates de email escritos a medida que llegan los resultados
+    
+    Memoria constante: solo se guardan los totales para la hoja de resumen.
+    """
+    
+    def __init__(self, generator, form_id=None):
+        self.generator = generator
+        self.form_id = form_id
+        self.total = 0
+        self.successful_prefills = 0
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.links_path = generator.output_dir / f"LINKS_PREFILL_{generator.output_tag}{timestamp}.xlsx"
+        self.templates_path = generator.output_dir / f"EMAIL_TEMPLATES_{generator.output_tag}{timestamp}.txt"
+        
+        self.writer = StreamingExcelWriter(self.links_path)
+        self.links_sheet = generator._add_links_sheet(self.writer)
+        
+        self.templates_file = open(self.templates_path, 'w', encoding='utf-8')
+        self.templates_file.write("=" * 80 + "\n")
+        self.templates_file.write("TEMPLATES DE EMAIL PARA FORMULARIOS PREFILL 5REC\n")
+        self.templates_file.write("=" * 80 + "\n\n")
+        self.templates_file.write(f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    
+    def append(self, results_data):
+        """Agregar un bloque de resultados del motor de prefill"""
+        for result in results_data:
+            self.total += 1
+            if result.get('prefill_success', False):
+                self.successful_prefills += 1
+            
+            self.links_sheet.append(self.generator._build_link_row(self.total, result))
+            self.generator._write_email_template(self.templates_file, self.total, result)
+    
+    def close(self):
+        """Escribir la hoja de resumen y cerrar ambos archivos"""
+        self.generator._write_summary_sheet(self.writer, self.form_id, self.total, self.successful_prefills)
+        self.writer.save()
+        record_artifact(self.links_path, artifact_pattern("LINKS_PREFILL", self.generator.output_tag, ".xlsx"))
+        
+        # El total solo se conoce al final: va al pie del archivo de templates
+        self.templates_file.write(f"Total organizaciones: {self.total}\n")
+        self.templates_file.close()
+        
+        print(f"✅ Tabla Excel generada: {self.links_path.name}")
+        print(f"   📊 Total registros: {self.total}")
+        print(f"✅ Templates de email generados: {self.templates_path.name}")
+        
+        return self.links_path, self.templates_path
\ No newline at end of file
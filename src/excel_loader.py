@@ -0,0 +1,155 @@
+"""
+Excel Loader - Lectura rápida de hojas de Excel de entrada
+Usa el motor calamine si está instalado y cachea la hoja como Parquet para lecturas repetidas;
+para workbooks muy grandes, lectura por bloques de filas
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from config import EXCEL_PARQUET_CACHE
+
+CACHE_DIR = Path("../outputs/.cache")
+
+def _cache_path(excel_path, sheet_name, prepare=None):
+    """Archivo Parquet de la hoja, invalidado si el Excel cambia (ruta, tamaño, mtime)"""
+    excel_path = Path(excel_path).resolve()
+    stat = excel_path.stat()
+    prepared = getattr(prepare, '__qualname__', '')
+    raw = f"{excel_path}|{sheet_name}|{prepared}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+    return CACHE_DIR / f"{excel_path.stem}_{digest}.parquet"
+
+def _read_workbook_sheet(excel_path, sheet_name):
+    """Leer con calamine (Rust) si está disponible; si no, con openpyxl"""
+    try:
+        return pd.read_excel(excel_path, sheet_name=sheet_name, engine="calamine")
+    except (ImportError, ValueError) as e:
+        # Sin python-calamine o pandas < 2.2: motor por defecto
+        if isinstance(e, ValueError) and 'calamine' not in str(e).lower():
+            raise
+        return pd.read_excel(excel_path, sheet_name=sheet_name)
+
+def _as_cacheable(df):
+    """
+    Columnas de texto (dtype object) con cada valor como str, conservando los vacíos
+
+    Parquet exige un tipo por columna: una columna NIT con números y textos no se puede
+    escribir. El motor usa str() de cada valor para el payload, así que el texto no cambia.
+    """
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].map(str, na_action='ignore')
+    return df
+
+def read_excel_sheet(excel_path, sheet_name, prepare=None, use_cache=EXCEL_PARQUET_CACHE):
+    """
+    Leer una hoja de Excel como DataFrame
+
+    Args:
+        excel_path: Ruta del workbook
+        sheet_name: Nombre de la hoja
+        prepare: Función DataFrame -> DataFrame aplicada antes de cachear
+            (ej. quitar las filas de metadata de la plantilla)
+        use_cache: Reutilizar/crear la copia Parquet de la hoja (requiere pyarrow)
+    """
+    cache_file = _cache_path(excel_path, sheet_name, prepare) if use_cache else None
+
+    if cache_file is not None and cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception as e:
+            print(f"⚠️  Cache Parquet inválido, releyendo Excel: {e}")
+
+    df = _read_workbook_sheet(excel_path, sheet_name)
+    if prepare is not None:
+        df = prepare(df)
+    # Mismos tipos con o sin cache
+    df = _as_cacheable(df.reset_index(drop=True))
+
+    if cache_file is not None:
+        _write_cache(df, cache_file, Path(excel_path))
+
+    return df
+
+def _write_cache(df, cache_file, excel_path):
+    """
+    Escribir la copia Parquet de forma atómica
+
+    Varios formularios pueden leer el mismo Excel a la vez: se escribe a un temporal en el
+    mismo directorio y se reemplaza (os.replace), así ningún lector ve un archivo a medias.
+    """
+    tmp_path = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Quitar copias anteriores del mismo archivo (otro proceso puede haberlas quitado ya)
+        for stale in CACHE_DIR.glob(f"{excel_path.stem}_*.parquet"):
+            if stale.stem.rsplit('_', 1)[0] == excel_path.stem and stale.name != cache_file.name:
+                stale.unlink(missing_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=f".{cache_file.stem}_", suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_file)
+        tmp_path = None
+    except Exception as e:
+        # Sin pyarrow: se sigue sin cache
+        print(f"⚠️  No se pudo cachear {excel_path.name} como Parquet: {e}")
+    finally:
+        if tmp_path is not None:
+            Path(tmp_path).unlink(missing_ok=True)
+
+def _cell_value(value):
+    """Mismo tipo que pd.read_excel: floats enteros como int"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def iter_excel_chunks(excel_path, sheet_name, chunk_size):
+    """
+    Leer una hoja por bloques de filas sin cargar el workbook completo (openpyxl read-only)
+
+    Filas completamente vacías se omiten.
+
+    Returns:
+        (total_estimado, generador de DataFrames de hasta chunk_size filas)
+    """
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
+    worksheet = workbook[sheet_name]
+    # Dimensión declarada en el archivo (puede faltar en workbooks generados por otras herramientas)
+    total = worksheet.max_row - 1 if worksheet.max_row else None
+
+    def chunks():
+        try:
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+
+            columns = [
+                name if name is not None else f"Unnamed: {position}"
+                for position, name in enumerate(header)
+            ]
+
+            chunk = []
+            for values in rows:
+                if all(value is None for value in values):
+                    continue
+                row = [_cell_value(value) for value in values[:len(columns)]]
+                row.extend([None] * (len(columns) - len(row)))
+                chunk.append(row)
+
+                if len(chunk) >= chunk_size:
+                    yield pd.DataFrame(chunk, columns=columns)
+                    chunk = []
+
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns)
+        finally:
+            workbook.close()
+
+    return total, chunks()
@@ -0,0 +1,103 @@
+"""
+Excel Stream Writer - Escritura de Excel en streaming (openpyxl write-only)
+Las filas se escriben directo a disco; estilos de header y anchos se definen al inicio
+"""
+
+from pathlib import Path
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+class StreamingSheet:
+    """Hoja write-only: solo admite agregar filas en orden"""
+
+    def __init__(self, worksheet, column_styles=None):
+        self.worksheet = worksheet
+        # Índice de columna (0-based) -> dict de estilos para celdas de datos
+        self.column_styles = column_styles or {}
+        self.row_count = 0
+
+    def _styled_cell(self, value, font=None, fill=None, alignment=None):
+        cell = WriteOnlyCell(self.worksheet, value=value)
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if alignment is not None:
+            cell.alignment = alignment
+        return cell
+
+    def write_header(self, headers, font=None, fill=None, alignment=None):
+        """Escribir la fila de encabezado con un estilo común"""
+        self.worksheet.append([
+            self._styled_cell(header, font=font, fill=fill, alignment=alignment)
+            for header in headers
+        ])
+
+    def append(self, values, row_styles=None):
+        """
+        Agregar una fila de datos aplicando los estilos por columna
+
+        Args:
+            values: Valores de la fila
+            row_styles: Estilos solo para esta fila (índice de columna -> estilos),
+                reemplazan a los estilos por columna
+        """
+        styles = {**self.column_styles, **row_styles} if row_styles else self.column_styles
+        if styles:
+            values = [
+                self._styled_cell(value, **styles[col]) if col in styles else value
+                for col, value in enumerate(values)
+            ]
+        self.worksheet.append(values)
+        self.row_count += 1
+
+    def append_many(self, rows):
+        for values in rows:
+            self.append(values)
+
+    def merge_cells(self, cell_range):
+        """Combinar celdas (ej. 'A1:B1'); admitido en hojas write-only"""
+        self.worksheet.merged_cells.add(cell_range)
+
+class StreamingExcelWriter:
+    """Workbook en modo write-only: memoria constante sin importar el número de filas"""
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self.workbook = Workbook(write_only=True)
+
+    def add_sheet(self, title, column_widths=None, freeze_panes=None, column_styles=None, header_height=None):
+        """
+        Crear una hoja con anchos y paneles definidos antes de escribir filas
+
+        Args:
+            title: Nombre de la hoja
+            column_widths: Dict letra de columna -> ancho
+            freeze_panes: Celda de inmovilización (ej. 'A2')
+            column_styles: Dict índice de columna (0-based) -> {'font', 'fill', 'alignment'}
+            header_height: Altura de la fila 1
+        """
+        worksheet = self.workbook.create_sheet(title)
+
+        for col_letter, width in (column_widths or {}).items():
+            worksheet.column_dimensions[col_letter].width = width
+
+        if freeze_panes:
+            worksheet.freeze_panes = freeze_panes
+
+        if header_height:
+            worksheet.row_dimensions[1].height = header_height
+
+        return StreamingSheet(worksheet, column_styles)
+
+    def save(self):
+        self.workbook.save(self.filepath)
+        return self.filepath
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
+        return False
@@ -3,24 +3,28 @@ Form Analyzer - Advanced JotForm metadata extraction and analysis
 Optimized replacement for formMetadata.py with enhanced features
 """
 
-import requests
 import json
 import csv
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from config import JOTFORM_API_KEY, FORM_ID
+from jotform_client import get_jotform_client
+from form_schema_cache import get_form_schema_cache
+from artifact_manifest import artifact_pattern, record_artifact
 
 class JotFormAnalyzer:
     """Advanced JotForm metadata analyzer with comprehensive reporting"""
     
-    def __init__(self):
+    def __init__(self, form_id=None):
         self.api_key = JOTFORM_API_KEY
-        self.form_id = FORM_ID
-        self.base_url = "https://api.jotform.com"
-        self.headers = {"APIKEY": self.api_key}
+        self.form_id = form_id or FORM_ID
+        # Multi-form mode: form ID in output filenames so concurrent runs don't collide
+        self.output_tag = f"{form_id}_" if form_id else ""
+        self.client = get_jotform_client()
         self.form_data = {}
         self.questions_data = {}
         self.analysis_results = {}
@@ -57,8 +61,7 @@ class JotFormAnalyzer:
         print("📋 Obteniendo información del formulario...")
         
         try:
-            url = f"{self.base_url}/form/{self.form_id}"
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = self.client.get(f"/form/{self.form_id}", timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -81,17 +84,14 @@ class JotFormAnalyzer:
         print("\n❓ Obteniendo preguntas del formulario...")
         
         try:
-            url = f"{self.base_url}/form/{self.form_id}/questions"
-            response = requests.get(url, headers=self.headers, timeout=15)
+            questions = get_form_schema_cache().get_questions(self.form_id, timeout=15)
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('responseCode') == 200:
-                    self.questions_data = data.get('content', {})
-                    print(f"✅ {len(self.questions_data)} preguntas obtenidas")
-                    return True
+            if questions is not None:
+                self.questions_data = questions
+                print(f"✅ {len(self.questions_data)} preguntas obtenidas")
+                return True
             
-            print(f"❌ Error obteniendo preguntas: {response.status_code}")
+            print(f"❌ Error obteniendo preguntas del formulario {self.form_id}")
             return False
             
         except Exception as e:
@@ -176,7 +176,7 @@ class JotFormAnalyzer:
     def generate_csv_report(self):
         """Generate comprehensive CSV report"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"../outputs/FORM_ANALYSIS_{timestamp}.csv"
+        filename = f"../outputs/FORM_ANALYSIS_{self.output_tag}{timestamp}.csv"
         
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
@@ -219,7 +219,7 @@ class JotFormAnalyzer:
     def generate_excel_report(self):
         """Generate comprehensive Excel report with multiple sheets"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"../outputs/FORM_ANALYSIS_{timestamp}.xlsx"
+        filename = f"../outputs/FORM_ANALYSIS_{self.output_tag}{timestamp}.xlsx"
         
         try:
             wb = Workbook()
@@ -336,7 +336,7 @@ class JotFormAnalyzer:
     def generate_json_export(self):
         """Generate complete JSON export"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"../outputs/FORM_COMPLETE_{timestamp}.json"
+        filename = f"../outputs/FORM_COMPLETE_{self.output_tag}{timestamp}.json"
         
         try:
             export_data = {
@@ -353,6 +353,9 @@ class JotFormAnalyzer:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(export_data, f, indent=2, ensure_ascii=False)
             
+            # Latest FORM_COMPLETE for the prefill engine, without scanning ../outputs
+            record_artifact(filename, artifact_pattern("FORM_COMPLETE", self.output_tag, ".json"))
+            
             print(f"✅ Exportación JSON completa: {filename}")
             return filename
             
@@ -368,13 +371,18 @@ class JotFormAnalyzer:
         print(f"Formulario ID: {self.form_id}")
         print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Step 1: Fetch form info
-        if not self.fetch_form_info():
+        # Steps 1-2: Fetch form info and questions concurrently (independent API calls)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            info_future = executor.submit(self.fetch_form_info)
+            questions_future = executor.submit(self.fetch_form_questions)
+            info_ok = info_future.result()
+            questions_ok = questions_future.result()
+        
+        if not info_ok:
             print("\n❌ No se pudo obtener información del formulario")
             return False
         
-        # Step 2: Fetch questions
-        if not self.fetch_form_questions():
+        if not questions_ok:
             print("\n❌ No se pudieron obtener las preguntas")
             return False
         
@@ -386,9 +394,14 @@ class JotFormAnalyzer:
         # Step 4: Generate reports
         print("\n📊 Generando reportes...")
         
-        csv_file = self.generate_csv_report()
-        excel_file = self.generate_excel_report()
-        json_file = self.generate_json_export()
+        # Los tres reportes solo leen los datos ya analizados: se escriben en paralelo
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            csv_future = executor.submit(self.generate_csv_report)
+            excel_future = executor.submit(self.generate_excel_report)
+            json_future = executor.submit(self.generate_json_export)
+            csv_file = csv_future.result()
+            excel_file = excel_future.result()
+            json_file = json_future.result()
         
         print("\n" + "=" * 60)
         print("✅ ANÁLISIS COMPLETADO EXITOSAMENTE")
@@ -4,22 +4,65 @@ Usa IDs específicos de preguntas y genera tablas detalladas
 """
 
 import pandas as pd
-import requests
 import json
 from datetime import datetime
 from pathlib import Path
-from fuzzywuzzy import fuzz, process
 import time
+from concurrent.futures import ThreadPoolExecutor
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 
-from config import JOTFORM_API_KEY, FORM_ID
+from config import JOTFORM_API_KEY, FORM_ID, SUBMISSIONS_PAGE_SIZE, MONITOR_INCREMENTAL_SYNC, MONITOR_PARQUET_SNAPSHOTS, MONITOR_FULL_RECONCILE_HOURS
+from jotform_client import get_jotform_client
+from submission_store import SubmissionStore
+from company_matcher import CompanyMatcher
+from excel_stream_writer import StreamingExcelWriter
+from form_schema_cache import get_form_schema_cache, schema_hash
+from artifact_manifest import artifact_pattern, latest_artifact
+from submission_snapshot import SubmissionSnapshotWriter, list_snapshot_dates, load_snapshot
+
+# Submissions escritas al almacén local por transacción
+SYNC_BATCH_SIZE = 500
+
+# Submissions clasificadas y volcadas a la tabla detallada / snapshots por bloque
+PROCESS_BATCH_SIZE = 500
+
+# Tipos de campo que NO requieren respuesta (excluidos de la tabla detallada)
+EXCLUDED_QUESTION_TYPES = {
+    'control_head',          # Títulos/encabezados
+    'control_pagebreak',     # Separadores de página
+    'control_button',        # Botones
+    'control_text',          # Textos informativos
+    'control_divider',       # Divisores
+    'control_image',         # Imágenes
+    'control_collapse',      # Secciones colapsables
+    'control_widget'         # Widgets especiales
+}
+
+# Columnas de la tabla de estado por empresa
+STATUS_TABLE_COLUMNS = [
+    'Empresa/Organización', 'Tipo Organización', 'Tipo Submission', 'Estado',
+    'Fecha Respuesta', 'Match Prefill', 'Score Match', 'ID Submission'
+]
+
+# Planes de columnas por hash de estructura del formulario (compartido entre ejecuciones)
+_QUESTION_PLAN_CACHE = {}
+
+def _empresa_sort_key(empresa):
+    """Orden ascendente por empresa con valores vacíos al final (como pandas)"""
+    if empresa is None or (isinstance(empresa, float) and pd.isna(empresa)):
+        return (1, '')
+    return (0, str(empresa))
 
 class FormMonitorV2:
     """Monitor específico con IDs de preguntas definidos"""
     
-    def __init__(self):
+    def __init__(self, form_id=None):
         self.api_key = JOTFORM_API_KEY
-        self.form_id = FORM_ID
-        self.base_url = "https://api.jotform.com"
+        self.form_id = form_id or FORM_ID
+        # Multi-form mode: form ID in output filenames so concurrent runs don't collide
+        self.output_tag = f"{form_id}_" if form_id else ""
+        self.client = get_jotform_client()
         
         # IDs específicos de preguntas
         self.company_field_id = "7"  # Nombre Empresa/Organización
@@ -27,8 +70,21 @@ class FormMonitorV2:
         
         # Data containers
         self.form_questions = {}
+        self.form_structure_hash = None
         self.all_submissions = []
         self.prefill_records = pd.DataFrame()
+        self.company_matcher = None
+        
+        # Salidas con las respuestas completas, escritas por bloques durante el procesamiento
+        self._detailed_table = None
+        self._snapshot_writer = None
+        
+        # Resultado de la última ejecución (consolidado multi-formulario)
+        self.status_rows = []
+        self.run_summary = {}
+        
+        # Almacén local para sincronización incremental
+        self.store = SubmissionStore()
         
         print(f"🔍 Form Monitor V2 inicializado")
         print(f"   📋 Formulario ID: {self.form_id}")
@@ -40,15 +96,15 @@ class FormMonitorV2:
         print("\n📊 Cargando registros de prefills enviados...")
         
         try:
-            outputs_dir = Path("../outputs")
-            prefill_files = list(outputs_dir.glob("LINKS_PREFILL_*.xlsx"))
+            # Multi-formulario: solo los links generados para este formulario
+            latest_file, _ = latest_artifact(artifact_pattern("LINKS_PREFILL", self.output_tag, ".xlsx"))
             
-            if not prefill_files:
+            if latest_file is None:
                 print("⚠️  No se encontraron archivos de prefill")
                 return False
             
-            latest_file = max(prefill_files, key=lambda x: x.stat().st_mtime)
             self.prefill_records = pd.read_excel(latest_file, sheet_name="🔗 LINKS PREFILL")
+            self.company_matcher = None
             
             print(f"✅ Prefills cargados: {len(self.prefill_records)} registros")
             print(f"   📁 Archivo: {latest_file.name}")
@@ -64,12 +120,12 @@ class FormMonitorV2:
         print(f"\n🏗️  Obteniendo estructura del formulario...")
         
         try:
-            url = f"{self.base_url}/form/{self.form_id}/questions?apiKey={self.api_key}"
-            response = requests.get(url, timeout=30)
-            data = response.json()
+            schema_cache = get_form_schema_cache()
+            questions = schema_cache.get_questions(self.form_id, timeout=30)
             
-            if response.status_code == 200 and data.get('responseCode') == 200:
-                self.form_questions = data.get('content', {})
+            if questions is not None:
+                self.form_questions = questions
+                self.form_structure_hash = schema_cache.content_hash(self.form_id)
                 
                 print(f"✅ Estructura obtenida: {len(self.form_questions)} preguntas")
                 
@@ -88,49 +144,180 @@ class FormMonitorV2:
                 
                 return True
             else:
-                print(f"❌ Error API: {data.get('message', 'Unknown error')}")
+                print(f"❌ Error API: no se pudo obtener la estructura del formulario {self.form_id}")
                 return False
                 
         except Exception as e:
             print(f"❌ Error obteniendo formulario: {e}")
             return False
 
+    def _fetch_submissions_page(self, offset, limit, filters=None):
+        """Obtener una página de submissions (offset/limit)"""
+        params = {'offset': offset, 'limit': limit}
+        if filters:
+            params['filter'] = json.dumps(filters)
+        response = self.client.get(f"/form/{self.form_id}/submissions", params=params, timeout=30)
+        data = response.json()
+        
+        if response.status_code == 200 and data.get('responseCode') == 200:
+            return data.get('content', [])
+        
+        raise RuntimeError(f"Error API: {data.get('message', 'Unknown error')}")
+
+    def iter_submissions(self, page_size=None, prefetch=True, filters=None):
+        """
+        Recorrer todas las submissions página a página, una a la vez
+        
+        Args:
+            page_size: Submissions por página (default SUBMISSIONS_PAGE_SIZE)
+            prefetch: Descargar la siguiente página mientras se procesa la actual
+            filters: Filtro del API de JotForm, ej. {'updated_at:gt': '2025-08-01 00:00:00'}
+        """
+        page_size = page_size or SUBMISSIONS_PAGE_SIZE
+        seen_ids = set()
+        offset = 0
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(self._fetch_submissions_page, offset, page_size, filters)
+            
+            while next_page is not None:
+                page = next_page.result()
+                offset += len(page)
+                
+                # Página incompleta = última página
+                has_more = len(page) == page_size
+                next_page = None
+                if has_more and prefetch:
+                    next_page = executor.submit(self._fetch_submissions_page, offset, page_size, filters)
+                
+                for submission in page:
+                    # Las páginas se desplazan si llegan respuestas nuevas durante la descarga
+                    submission_id = submission.get('id')
+                    if submission_id in seen_ids:
+                        continue
+                    seen_ids.add(submission_id)
+                    yield submission
+                
+                if has_more and not prefetch:
+                    next_page = executor.submit(self._fetch_submissions_page, offset, page_size, filters)
+
     def get_all_submissions(self):
         """Obtener todas las submissions del formulario"""
         print(f"\n📥 Obteniendo submissions del formulario...")
         
         try:
-            url = f"{self.base_url}/form/{self.form_id}/submissions?apiKey={self.api_key}"
-            response = requests.get(url, timeout=30)
-            data = response.json()
+            self.all_submissions = list(self.iter_submissions())
             
-            if response.status_code == 200 and data.get('responseCode') == 200:
-                self.all_submissions = data.get('content', [])
-                
-                print(f"✅ Submissions obtenidas: {len(self.all_submissions)}")
-                
-                if self.all_submissions:
-                    for i, submission in enumerate(self.all_submissions[:3]):
-                        submission_id = submission.get('id', 'N/A')
-                        created_at = submission.get('created_at', 'N/A')
-                        print(f"   {i+1}. ID: {submission_id} - Fecha: {created_at}")
+            print(f"✅ Submissions obtenidas: {len(self.all_submissions)}")
+            
+            if self.all_submissions:
+                for i, submission in enumerate(self.all_submissions[:3]):
+                    submission_id = submission.get('id', 'N/A')
+                    created_at = submission.get('created_at', 'N/A')
+                    print(f"   {i+1}. ID: {submission_id} - Fecha: {created_at}")
+            
+            return True
                 
-                return True
+        except Exception as e:
+            print(f"❌ Error obteniendo submissions: {e}")
+            return False
+
+    def sync_submissions(self):
+        """Sincronizar incrementalmente las submissions nuevas o modificadas al almacén local"""
+        print(f"\n🔁 Sincronizando submissions (modo incremental)...")
+        
+        try:
+            watermark = self.store.get_watermark(self.form_id)
+            reconcile = self._reconcile_due(watermark)
+            started_at = datetime.now()
+            
+            if not watermark:
+                print(f"   📥 Primera sincronización: descarga completa")
+                sources = [self.iter_submissions()]
+            elif reconcile:
+                # El filtro gte nunca trae las borradas: cada tanto se relista todo y se
+                # quitan del almacén los ids que ya no están en JotForm
+                print(f"   🧹 Reconciliación completa de ids (cada {MONITOR_FULL_RECONCILE_HOURS:g} h)")
+                sources = [self.iter_submissions()]
             else:
-                print(f"❌ Error API: {data.get('message', 'Unknown error')}")
-                return False
+                print(f"   ⏱️  Última sincronización: {watermark}")
+                # El API combina filtros con AND: una pasada para nuevas y otra para editadas.
+                # El watermark tiene resolución de segundos: se incluye su segundo (gte) para no
+                # perder submissions del mismo segundo; el almacén descarta las ya guardadas
+                sources = [
+                    self.iter_submissions(filters={'created_at:gte': watermark}),
+                    self.iter_submissions(filters={'updated_at:gte': watermark})
+                ]
+            
+            synced = 0
+            new_watermark = watermark
+            listed_ids = set()
+            
+            for source in sources:
+                batch = []
+                for submission in source:
+                    listed_ids.add(str(submission.get('id')))
+                    batch.append(submission)
+                    if len(batch) >= SYNC_BATCH_SIZE:
+                        count, latest = self.store.upsert_submissions(self.form_id, batch)
+                        synced += count
+                        new_watermark = max(filter(None, [new_watermark, latest]), default=None)
+                        batch = []
                 
+                if batch:
+                    count, latest = self.store.upsert_submissions(self.form_id, batch)
+                    synced += count
+                    new_watermark = max(filter(None, [new_watermark, latest]), default=None)
+            
+            # Solo avanzar el watermark tras una sincronización completa
+            if new_watermark:
+                self.store.set_watermark(self.form_id, new_watermark)
+            
+            if reconcile:
+                pruned = self.store.prune_missing(self.form_id, listed_ids)
+                self.store.set_reconciled_at(self.form_id, started_at)
+                print(f"   🗑️  Submissions borradas en JotForm: {pruned}")
+            
+            print(f"✅ Submissions nuevas/actualizadas: {synced}")
+            print(f"   💾 Total en almacén local: {self.store.count(self.form_id)}")
+            
+            return True
+            
         except Exception as e:
-            print(f"❌ Error obteniendo submissions: {e}")
+            print(f"❌ Error sincronizando submissions: {e}")
             return False
 
-    def process_submissions(self):
-        """Procesar todas las submissions y extraer datos específicos"""
+    def _reconcile_due(self, watermark):
+        """Sin sincronización previa o con la última reconciliación más vieja que MONITOR_FULL_RECONCILE_HOURS"""
+        if not watermark:
+            return True
+        if MONITOR_FULL_RECONCILE_HOURS <= 0:
+            return False
+        reconciled_at = self.store.get_reconciled_at(self.form_id)
+        if reconciled_at is None:
+            return True
+        return (datetime.now() - reconciled_at).total_seconds() >= MONITOR_FULL_RECONCILE_HOURS * 3600
+
+    def process_submissions(self, submissions=None, answer_sinks=()):
+        """
+        Procesar todas las submissions y extraer datos específicos
+        
+        Args:
+            submissions: Iterable de submissions; por defecto las ya descargadas
+                o, si no hay, un recorrido paginado en streaming del API
+            answer_sinks: Funciones que reciben cada bloque ya clasificado con sus 'answers'
+                (tabla detallada, snapshots). El resultado solo conserva los campos de
+                resumen: las respuestas no se acumulan en memoria
+        """
         print(f"\n🔄 Procesando submissions...")
         
+        if submissions is None:
+            submissions = self.all_submissions or self.iter_submissions()
+        
         processed_submissions = []
+        batch = []
         
-        for submission in self.all_submissions:
+        for submission in submissions:
             answers = submission.get('answers', {})
             
             # Extraer datos específicos
@@ -141,23 +328,23 @@ class FormMonitorV2:
             status = submission.get('status', 'ACTIVE')
             estado = "✅ Completado" if status == 'ACTIVE' else "❌ Pendiente"
             
-            # Clasificar como prefill o manual
-            tipo_submission = self._classify_submission(company_name)
-            
             submission_data = {
                 'submission_id': submission.get('id'),
                 'empresa': company_name,
                 'tipo_organizacion': org_type,
-                'tipo_submission': tipo_submission['type'],
-                'matched_prefill_name': tipo_submission.get('matched_name'),
-                'match_score': tipo_submission.get('score', 0),
                 'estado': estado,
                 'fecha_respuesta': submission.get('created_at'),
                 'fecha_actualizacion': submission.get('updated_at'),
-                'answers': answers  # Para tabla detallada
+                'answers': answers  # Para tabla detallada, solo mientras dura el bloque
             }
             
-            processed_submissions.append(submission_data)
+            batch.append(submission_data)
+            if len(batch) >= PROCESS_BATCH_SIZE:
+                processed_submissions.extend(self._finish_batch(batch, answer_sinks))
+                batch = []
+        
+        if batch:
+            processed_submissions.extend(self._finish_batch(batch, answer_sinks))
         
         print(f"✅ Submissions procesadas: {len(processed_submissions)}")
         
@@ -172,6 +359,22 @@ class FormMonitorV2:
         
         return processed_submissions
 
+    def _finish_batch(self, batch, answer_sinks):
+        """Clasificar un bloque como prefill o manual, entregarlo a los sinks y soltar sus respuestas"""
+        classifications = self._classify_submissions([s['empresa'] for s in batch])
+        for submission_data, tipo_submission in zip(batch, classifications):
+            submission_data['tipo_submission'] = tipo_submission['type']
+            submission_data['matched_prefill_name'] = tipo_submission.get('matched_name')
+            submission_data['match_score'] = tipo_submission.get('score', 0)
+        
+        for sink in answer_sinks:
+            sink(batch)
+        
+        for submission_data in batch:
+            del submission_data['answers']
+        
+        return batch
+
     def _extract_answer(self, answers, field_id, default="N/A"):
         """Extraer respuesta específica de un campo"""
         if field_id not in answers:
@@ -185,6 +388,36 @@ class FormMonitorV2:
         
         return str(answer).strip() if answer else default
 
+    def _get_question_plan(self):
+        """Plan ordenado de columnas (qid, nombre) para los campos que requieren respuesta"""
+        # Hash ya calculado por el cache de estructura; si no, calcularlo aquí
+        structure_key = self.form_structure_hash or schema_hash(self.form_questions)
+        
+        # Reutilizar el plan si la estructura del formulario no cambió
+        if structure_key in _QUESTION_PLAN_CACHE:
+            return _QUESTION_PLAN_CACHE[structure_key]
+        
+        question_plan = []
+        
+        for qid, question_info in self.form_questions.items():
+            question_text = question_info.get('text', f'Pregunta {qid}')
+            question_type = question_info.get('type', 'unknown')
+            
+            # Excluir campos que NO requieren respuesta
+            if question_type in EXCLUDED_QUESTION_TYPES:
+                continue  # Saltar campos informativos
+            
+            # Filtrar textos que son claramente informativos
+            if self._is_informational_text(question_text):
+                continue  # Saltar textos informativos
+            
+            # Limpiar texto de pregunta (sin cortar)
+            clean_question = question_text.replace('\n', ' ').replace('\r', ' ').strip()
+            question_plan.append((qid, f"P{qid}: {clean_question}"))
+        
+        _QUESTION_PLAN_CACHE[structure_key] = question_plan
+        return question_plan
+
     def _is_informational_text(self, text):
         """Identificar si un texto es puramente informativo (no requiere respuesta)"""
         if not text:
@@ -223,62 +456,74 @@ class FormMonitorV2:
         
         return False
 
-    def _classify_submission(self, company_name):
-        """Clasificar submission como Prefill o Manual"""
-        if self.prefill_records.empty or not company_name or company_name == "Sin empresa":
-            return {'type': 'Manual', 'matched_name': None, 'score': 0}
+    def _get_company_matcher(self):
+        """Índice de empresas prefill, construido una sola vez por registro cargado"""
+        if self.company_matcher is None:
+            self.company_matcher = CompanyMatcher(
+                self.prefill_records['Empresa/Organización'].tolist(),
+                threshold=75  # 75% similaridad
+            )
+        return self.company_matcher
+
+    def _classify_submissions(self, company_names):
+        """Clasificar en bloque (matriz de similitud vectorizada) una lista de empresas"""
+        manual = {'type': 'Manual', 'matched_name': None, 'score': 0}
+        classifications = [manual] * len(company_names)
         
-        # Lista de empresas de prefill
-        prefill_companies = self.prefill_records['Empresa/Organización'].tolist()
+        if self.prefill_records.empty:
+            return classifications
         
-        # Fuzzy matching
-        best_match = process.extractOne(
-            company_name, 
-            prefill_companies,
-            scorer=fuzz.token_sort_ratio
+        positions = [i for i, name in enumerate(company_names) if name and name != "Sin empresa"]
+        matched_names, scores = self._get_company_matcher().match_many(
+            [company_names[i] for i in positions]
         )
         
-        if best_match and best_match[1] >= 75:  # 75% similaridad
-            return {
-                'type': 'Prefill',
-                'matched_name': best_match[0],
-                'score': best_match[1]
-            }
-        else:
-            return {'type': 'Manual', 'matched_name': None, 'score': 0}
+        for position, matched_name, score in zip(positions, matched_names, scores):
+            if matched_name is not None:
+                classifications[position] = {
+                    'type': 'Prefill',
+                    'matched_name': matched_name,
+                    'score': int(score)
+                }
+        
+        return classifications
 
     def add_pending_prefills(self, processed_submissions):
         """Agregar empresas prefill que no han respondido"""
         if self.prefill_records.empty:
             return processed_submissions
         
-        # Obtener empresas que ya respondieron
-        responded_companies = []
-        for submission in processed_submissions:
-            if submission['tipo_submission'] == 'Prefill':
-                responded_companies.append(submission['matched_prefill_name'])
+        # Obtener empresas que ya respondieron (set: búsqueda O(1))
+        responded_companies = {
+            submission['matched_prefill_name']
+            for submission in processed_submissions
+            if submission['tipo_submission'] == 'Prefill'
+        }
+        
+        if 'Empresa/Organización' not in self.prefill_records.columns:
+            return processed_submissions.copy()
+        
+        # Anti-join: prefills cuya empresa no está entre las que respondieron
+        empresas = self.prefill_records['Empresa/Organización']
+        pending_mask = empresas.map(bool) & ~empresas.isin(responded_companies)
         
         # Agregar pendientes
-        extended_submissions = processed_submissions.copy()
-        
-        for _, prefill_row in self.prefill_records.iterrows():
-            empresa = prefill_row.get('Empresa/Organización', '')
-            if empresa and empresa not in responded_companies:
-                pending_submission = {
-                    'submission_id': 'N/A - Pendiente',
-                    'empresa': empresa,
-                    'tipo_organizacion': 'N/A - Sin responder',
-                    'tipo_submission': 'Prefill',
-                    'matched_prefill_name': empresa,
-                    'match_score': 100,
-                    'estado': '❌ Pendiente',
-                    'fecha_respuesta': 'N/A',
-                    'fecha_actualizacion': 'N/A',
-                    'answers': {}
-                }
-                extended_submissions.append(pending_submission)
+        pending_submissions = [
+            {
+                'submission_id': 'N/A - Pendiente',
+                'empresa': empresa,
+                'tipo_organizacion': 'N/A - Sin responder',
+                'tipo_submission': 'Prefill',
+                'matched_prefill_name': empresa,
+                'match_score': 100,
+                'estado': '❌ Pendiente',
+                'fecha_respuesta': 'N/A',
+                'fecha_actualizacion': 'N/A'
+            }
+            for empresa in empresas[pending_mask].tolist()
+        ]
         
-        return extended_submissions
+        return processed_submissions + pending_submissions
 
     def generate_company_status_table(self, submissions_data, timestamp):
         """Generar tabla 1: Estado por empresa"""
@@ -287,50 +532,79 @@ class FormMonitorV2:
         table_data = []
         
         for submission in submissions_data:
-            table_data.append({
-                'Empresa/Organización': submission['empresa'],
-                'Tipo Organización': submission['tipo_organizacion'],
-                'Tipo Submission': submission['tipo_submission'],
-                'Estado': submission['estado'],
-                'Fecha Respuesta': submission['fecha_respuesta'],
-                'Match Prefill': submission.get('matched_prefill_name', 'N/A'),
-                'Score Match': f"{submission.get('match_score', 0)}%",
-                'ID Submission': submission['submission_id']
-            })
-        
-        # Crear DataFrame
-        df = pd.DataFrame(table_data)
-        
-        # Ordenar por estado (completados primero) y luego por empresa
-        df_sorted = df.sort_values(['Estado', 'Empresa/Organización'], ascending=[False, True])
-        
-        # Generar Excel
-        filename = f"../outputs/ESTADO_EMPRESAS_{timestamp}.xlsx"
-        
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df_sorted.to_excel(writer, sheet_name='📊 ESTADO EMPRESAS', index=False)
-            
-            # Formatear
-            worksheet = writer.sheets['📊 ESTADO EMPRESAS']
-            self._format_status_table(worksheet, len(df_sorted))
+            table_data.append([
+                submission['empresa'],
+                submission['tipo_organizacion'],
+                submission['tipo_submission'],
+                submission['estado'],
+                submission['fecha_respuesta'],
+                submission.get('matched_prefill_name', 'N/A'),
+                f"{submission.get('match_score', 0)}%",
+                submission['submission_id']
+            ])
+        
+        # Ordenar por estado (completados primero) y luego por empresa (sorts estables)
+        table_data.sort(key=lambda row: _empresa_sort_key(row[0]))
+        table_data.sort(key=lambda row: row[3], reverse=True)
+        self.status_rows = table_data
+        
+        # Generar Excel en streaming
+        filename = f"../outputs/ESTADO_EMPRESAS_{self.output_tag}{timestamp}.xlsx"
+        
+        with StreamingExcelWriter(filename) as writer:
+            sheet = writer.add_sheet(
+                '📊 ESTADO EMPRESAS',
+                column_widths={'A': 40, 'B': 25, 'C': 15, 'D': 15, 'E': 20, 'F': 30, 'G': 12, 'H': 20},
+                freeze_panes='A2'
+            )
+            sheet.write_header(STATUS_TABLE_COLUMNS, **self._header_style("2C5AA0"))
+            sheet.append_many(table_data)
         
         print(f"✅ Tabla estado empresas: {filename}")
         return filename
 
-    def generate_detailed_responses_table(self, submissions_data, timestamp):
-        """Generar tabla 2: Respuestas detalladas por empresa y pregunta"""
+    def start_detailed_responses_table(self, timestamp):
+        """Generar tabla 2: Respuestas detalladas por empresa y pregunta (filas por bloque)"""
         print(f"\n📋 Generando tabla de respuestas detalladas...")
         
-        # Solo procesar submissions que tienen respuestas
-        submissions_with_answers = [s for s in submissions_data if s['answers'] and s['estado'] == '✅ Completado']
-        
-        if not submissions_with_answers:
-            print("⚠️  No hay submissions con respuestas para tabla detallada")
-            return None
-        
-        table_data = []
+        # Columnas de preguntas: calculadas una vez por estructura del formulario
+        question_plan = self._get_question_plan()
+        base_columns = ['Empresa/Organización', 'Tipo Submission', 'Fecha Respuesta', 'ID Submission']
+        headers = list(dict.fromkeys(base_columns + [col_name for _, col_name in question_plan]))
+        
+        # Anchos definidos de antemano a partir del texto de cada encabezado
+        column_widths = {
+            get_column_letter(col): 25 if col <= 4 else self._detailed_column_width(header)
+            for col, header in enumerate(headers, 1)
+        }
+        
+        # Generar Excel en streaming: cada fila se escribe directo a disco
+        filename = f"../outputs/RESPUESTAS_DETALLADAS_{self.output_tag}{timestamp}.xlsx"
+        writer = StreamingExcelWriter(filename)
+        sheet = writer.add_sheet(
+            '📋 RESPUESTAS DETALLADAS',
+            column_widths=column_widths,
+            freeze_panes='E2',  # Freeze las primeras 4 columnas
+            header_height=40  # Altura del header para texto largo
+        )
+        sheet.write_header(headers, **self._header_style("1F4E79", wrap_text=True))
+        
+        self._detailed_table = {
+            'filename': filename,
+            'writer': writer,
+            'sheet': sheet,
+            'question_plan': question_plan
+        }
+
+    def append_detailed_responses(self, submissions_data):
+        """Escribir las filas de un bloque de submissions procesadas (con 'answers')"""
+        table = self._detailed_table
         
-        for submission in submissions_with_answers:
+        # Solo procesar submissions que tienen respuestas
+        for submission in submissions_data:
+            if not submission['answers'] or submission['estado'] != '✅ Completado':
+                continue
+            
             row_data = {
                 'Empresa/Organización': submission['empresa'],
                 'Tipo Submission': submission['tipo_submission'],
@@ -340,122 +614,105 @@ class FormMonitorV2:
             
             # Agregar respuesta de cada pregunta (solo campos que requieren respuesta)
             answers = submission['answers']
-            for qid, question_info in self.form_questions.items():
-                question_text = question_info.get('text', f'Pregunta {qid}')
-                question_type = question_info.get('type', 'unknown')
-                
-                # Excluir campos que NO requieren respuesta
-                excluded_types = [
-                    'control_head',          # Títulos/encabezados
-                    'control_pagebreak',     # Separadores de página
-                    'control_button',        # Botones
-                    'control_text',          # Textos informativos
-                    'control_divider',       # Divisores
-                    'control_image',         # Imágenes
-                    'control_collapse',      # Secciones colapsables
-                    'control_widget'         # Widgets especiales
-                ]
-                
-                if question_type in excluded_types:
-                    continue  # Saltar campos informativos
-                
-                # Filtrar textos que son claramente informativos
-                if self._is_informational_text(question_text):
-                    continue  # Saltar textos informativos
-                
-                # Limpiar texto de pregunta (sin cortar)
-                clean_question = question_text.replace('\n', ' ').replace('\r', ' ').strip()
-                col_name = f"P{qid}: {clean_question}"
-                
-                # Obtener respuesta
-                answer = self._extract_answer(answers, qid, "Sin respuesta")
-                row_data[col_name] = answer
-            
-            table_data.append(row_data)
-        
-        # Crear DataFrame
-        df = pd.DataFrame(table_data)
-        
-        # Generar Excel
-        filename = f"../outputs/RESPUESTAS_DETALLADAS_{timestamp}.xlsx"
-        
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='📋 RESPUESTAS DETALLADAS', index=False)
+            row_data.update({
+                col_name: self._extract_answer(answers, qid, "Sin respuesta")
+                for qid, col_name in table['question_plan']
+            })
             
-            # Formatear
-            worksheet = writer.sheets['📋 RESPUESTAS DETALLADAS']
-            self._format_detailed_table(worksheet, len(df), len(df.columns))
-        
-        print(f"✅ Tabla respuestas detalladas: {filename}")
-        return filename
+            table['sheet'].append(list(row_data.values()))
 
-    def _format_status_table(self, worksheet, row_count):
-        """Formatear tabla de estado"""
-        from openpyxl.styles import Font, PatternFill, Alignment
+    def finish_detailed_responses_table(self):
+        """Guardar la tabla 2; None si ninguna submission tenía respuestas"""
+        table, self._detailed_table = self._detailed_table, None
         
-        # Header
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="2C5AA0", end_color="2C5AA0", fill_type="solid")
-        
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        if table['sheet'].row_count == 0:
+            print("⚠️  No hay submissions con respuestas para tabla detallada")
+            return None
         
-        # Anchos de columna
-        column_widths = {'A': 40, 'B': 25, 'C': 15, 'D': 15, 'E': 20, 'F': 30, 'G': 12, 'H': 20}
-        for col_letter, width in column_widths.items():
-            worksheet.column_dimensions[col_letter].width = width
+        table['writer'].save()
+        print(f"✅ Tabla respuestas detalladas: {table['filename']}")
+        return table['filename']
+
+    def start_snapshots(self):
+        """Abrir los snapshots Parquet (tabla larga y ancha) de la partición de hoy"""
+        try:
+            self._snapshot_writer = SubmissionSnapshotWriter(self.form_id, self._get_question_plan())
+        except Exception as e:
+            # Sin pyarrow: el monitoreo sigue solo con Excel
+            print(f"⚠️  No se pudieron guardar snapshots Parquet: {e}")
+            self._snapshot_writer = None
+
+    def append_snapshots(self, submissions_data):
+        """Agregar un bloque a los snapshots; un error los descarta sin detener el monitoreo"""
+        if self._snapshot_writer is None:
+            return
         
-        # Freeze panes
-        worksheet.freeze_panes = 'A2'
+        try:
+            self._snapshot_writer.append(submissions_data)
+        except Exception as e:
+            print(f"⚠️  No se pudieron guardar snapshots Parquet: {e}")
+            self._snapshot_writer.abort()
+            self._snapshot_writer = None
 
-    def _format_detailed_table(self, worksheet, row_count, col_count):
-        """Formatear tabla detallada"""
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from openpyxl.utils import get_column_letter
+    def finish_snapshots(self, processed_submissions):
+        """Publicar los snapshots del día y compararlos con la ejecución anterior"""
+        writer, self._snapshot_writer = self._snapshot_writer, None
+        if writer is None:
+            return None
         
-        # Header
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
+        print(f"\n🗃️  Guardando snapshots Parquet...")
+        previous_dates = [d for d in list_snapshot_dates(self.form_id) if d < writer.run_date]
         
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        try:
+            long_path, wide_path = writer.close()
+        except Exception as e:
+            writer.abort()
+            print(f"⚠️  No se pudieron guardar snapshots Parquet: {e}")
+            return None
         
-        # Ajustar columnas de forma inteligente
-        for col in range(1, col_count + 1):
-            col_letter = get_column_letter(col)
-            
-            if col <= 4:  # Primeras 4 columnas (info básica)
-                worksheet.column_dimensions[col_letter].width = 25
-            else:  # Columnas de preguntas - ancho adaptativo
-                # Calcular ancho basado en el contenido del header
-                header_cell = worksheet.cell(row=1, column=col)
-                header_text = str(header_cell.value) if header_cell.value else ""
-                
-                # Ancho mínimo 20, máximo 60, basado en longitud del texto
-                header_length = len(header_text)
-                if header_length <= 30:
-                    width = 25
-                elif header_length <= 60:
-                    width = 40
-                elif header_length <= 100:
-                    width = 55
-                else:
-                    width = 65
-                
-                worksheet.column_dimensions[col_letter].width = width
+        print(f"✅ Snapshot largo: {long_path}")
+        print(f"✅ Snapshot ancho: {wide_path}")
         
-        # Freeze panes
-        worksheet.freeze_panes = 'E2'  # Freeze las primeras 4 columnas
+        # Comparar con la ejecución anterior leyendo solo la columna de IDs
+        if previous_dates:
+            previous = load_snapshot(self.form_id, run_date=previous_dates[-1], columns=['submission_id'])
+            new_ids = {str(s['submission_id']) for s in processed_submissions} - set(previous['submission_id'])
+            print(f"   🆕 Submissions nuevas desde {previous_dates[-1]}: {len(new_ids)}")
         
-        # Altura del header para texto largo
-        worksheet.row_dimensions[1].height = 40
+        return long_path, wide_path
+
+    def _header_style(self, color, wrap_text=False):
+        """Estilo de encabezado: texto blanco en negrita sobre color corporativo"""
+        return {
+            'font': Font(bold=True, color="FFFFFF"),
+            'fill': PatternFill(start_color=color, end_color=color, fill_type="solid"),
+            'alignment': Alignment(horizontal="center", vertical="center", wrap_text=wrap_text)
+        }
 
-    def run_complete_monitoring(self):
-        """Ejecutar monitoreo completo"""
+    def _detailed_column_width(self, header_text):
+        """Ancho adaptativo de columnas de preguntas según la longitud del encabezado"""
+        # Ancho mínimo 20, máximo 60, basado en longitud del texto
+        header_length = len(header_text)
+        if header_length <= 30:
+            return 25
+        elif header_length <= 60:
+            return 40
+        elif header_length <= 100:
+            return 55
+        else:
+            return 65
+
+    def run_complete_monitoring(self, incremental=None):
+        """
+        Ejecutar monitoreo completo
+        
+        Args:
+            incremental: Sincronizar solo cambios contra el almacén local
+                (default MONITOR_INCREMENTAL_SYNC)
+        """
+        if incremental is None:
+            incremental = MONITOR_INCREMENTAL_SYNC
+        
         print("=" * 70)
         print("🔍 FORM MONITOR V2 - MONITOREO ESPECÍFICO 5REC")
         print("=" * 70)
@@ -470,22 +727,58 @@ class FormMonitorV2:
             print("❌ No se pudo obtener estructura del formulario")
             return False
         
-        # Paso 3: Obtener submissions
-        if not self.get_all_submissions():
-            print("❌ No se pudieron obtener submissions")
-            return False
+        # Paso 3-4: Obtener y procesar submissions; las respuestas completas van directo
+        # a la tabla detallada y a los snapshots, bloque por bloque
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        if incremental:
+            # Solo descargar cambios y procesar desde el almacén local
+            if not self.sync_submissions():
+                print("❌ No se pudieron sincronizar submissions")
+                return False
         
-        # Paso 4: Procesar submissions
-        processed_submissions = self.process_submissions()
+        self.start_detailed_responses_table(timestamp)
+        answer_sinks = [self.append_detailed_responses]
+        if MONITOR_PARQUET_SNAPSHOTS:
+            # Snapshots columnares para análisis posteriores
+            self.start_snapshots()
+            answer_sinks.append(self.append_snapshots)
+        
+        if incremental:
+            processed_submissions = self.process_submissions(
+                self.store.iter_submissions(self.form_id), answer_sinks=answer_sinks
+            )
+        else:
+            # Descarga completa paginada, en streaming
+            try:
+                processed_submissions = self.process_submissions(self.iter_submissions(), answer_sinks=answer_sinks)
+            except Exception as e:
+                if self._snapshot_writer is not None:
+                    self._snapshot_writer.abort()
+                    self._snapshot_writer = None
+                self._detailed_table = None
+                print(f"❌ Error obteniendo submissions: {e}")
+                print("❌ No se pudieron obtener submissions")
+                return False
         
         # Paso 5: Agregar prefills pendientes
         all_submissions = self.add_pending_prefills(processed_submissions)
         
         # Paso 6: Generar tablas
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
         status_file = self.generate_company_status_table(all_submissions, timestamp)
-        detailed_file = self.generate_detailed_responses_table(all_submissions, timestamp)
+        detailed_file = self.finish_detailed_responses_table()
+        
+        # Paso 7: Publicar los snapshots escritos durante el procesamiento
+        snapshot_files = self.finish_snapshots(processed_submissions)
+        
+        self.run_summary = {
+            'submissions': len(processed_submissions),
+            'with_pending_prefills': len(all_submissions),
+            'completed': sum(1 for s in all_submissions if s['estado'] == '✅ Completado'),
+            'status_file': status_file,
+            'detailed_file': detailed_file,
+            'snapshot_files': snapshot_files
+        }
         
         print("\n" + "=" * 70)
         print("✅ MONITOREO V2 COMPLETADO EXITOSAMENTE")
@@ -0,0 +1,147 @@
+"""
+Form Schema Cache - Cache en disco de la estructura del formulario (/form/{id}/questions)
+Compartido por analizador, monitor y validador: TTL + revalidación condicional (ETag)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+from config import FORM_SCHEMA_CACHE_TTL
+from jotform_client import get_jotform_client
+
+CACHE_DIR = Path("../outputs/.cache")
+
+def schema_hash(questions):
+    """Huella del contenido de la estructura (independiente del orden de las llaves)"""
+    raw = json.dumps(questions, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class FormSchemaCache:
+    """
+    Estructura del formulario por form_id, en memoria y en disco
+
+    Mientras la copia tenga menos de `ttl` segundos se usa sin ir al API. Después se
+    revalida con If-None-Match: un 304 (o el mismo contenido) solo renueva la fecha.
+    """
+
+    def __init__(self, client=None, cache_dir=CACHE_DIR, ttl=FORM_SCHEMA_CACHE_TTL):
+        self.client = client or get_jotform_client()
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+        # form_id -> {'questions', 'content_hash', 'etag', 'fetched_at'}
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Un lock por formulario: formularios distintos se consultan en paralelo
+        self._form_locks = {}
+
+    def _cache_file(self, form_id):
+        return self.cache_dir / f"form_schema_{form_id}.json"
+
+    def _load_entry(self, form_id):
+        """Entrada en memoria o, si no, la guardada en disco"""
+        entry = self._entries.get(form_id)
+        if entry is not None:
+            return entry
+
+        cache_file = self._cache_file(form_id)
+        if not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Cache de estructura inválido, se descarga de nuevo: {e}")
+            return None
+
+        self._entries[form_id] = entry
+        return entry
+
+    def _save_entry(self, form_id, entry):
+        self._entries[form_id] = entry
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: otro proceso nunca lee un archivo a medias
+            tmp_file = self._cache_file(form_id).with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            tmp_file.replace(self._cache_file(form_id))
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar la estructura en cache: {e}")
+
+    def get_questions(self, form_id, timeout=30):
+        """
+        Preguntas del formulario (dict qid -> pregunta) o None si el API no las entrega
+
+        Si el API falla y hay una copia vencida, se usa la copia.
+        """
+        with self._lock:
+            form_lock = self._form_locks.setdefault(form_id, threading.Lock())
+
+        with form_lock:
+            entry = self._load_entry(form_id)
+
+            if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+                return entry['questions']
+
+            headers = {}
+            if entry is not None and entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+
+            try:
+                response = self.client.get(f"/form/{form_id}/questions", headers=headers, timeout=timeout)
+            except Exception as e:
+                if entry is None:
+                    raise
+                print(f"⚠️  API no disponible ({e}) - usando estructura en cache")
+                return entry['questions']
+
+            if response.status_code == 304 and entry is not None:
+                entry['fetched_at'] = time.time()
+                self._save_entry(form_id, entry)
+                return entry['questions']
+
+            data = response.json() if response.status_code == 200 else {}
+            if data.get('responseCode') != 200:
+                if entry is not None:
+                    print(f"⚠️  Error API ({response.status_code}) - usando estructura en cache")
+                    return entry['questions']
+                return None
+
+            questions = data.get('content', {})
+            content_hash = schema_hash(questions)
+
+            # Sin ETag del API: mismo contenido -> se conserva la copia ya parseada
+            if entry is not None and entry['content_hash'] == content_hash:
+                questions = entry['questions']
+
+            self._save_entry(form_id, {
+                'form_id': form_id,
+                'questions': questions,
+                'content_hash': content_hash,
+                'etag': response.headers.get('ETag'),
+                'fetched_at': time.time()
+            })
+            return questions
+
+    def content_hash(self, form_id):
+        """Hash de la última estructura obtenida (None si no se ha consultado)"""
+        with self._lock:
+            entry = self._entries.get(form_id)
+            return entry['content_hash'] if entry else None
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_form_schema_cache():
+    """Cache único compartido por todas las clases del proceso"""
+    global _shared_cache
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = FormSchemaCache()
+        return _shared_cache
@@ -0,0 +1,99 @@
+"""
+JotForm Client - Cliente HTTP compartido para la API de JotForm
+Sesión keep-alive con pool de conexiones, rate limiting y reintentos para todas las clases
+"""
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import JOTFORM_API_KEY, JOTFORM_BASE_URL, JOTFORM_POOL_SIZE
+from rate_limiter import get_shared_rate_limiter
+from retry_policy import RetryPolicy, CircuitBreaker, TRANSIENT_STATUSES, is_transient_error
+
+class JotFormClient:
+    """Cliente de la API de JotForm sobre una requests.Session reutilizable"""
+
+    def __init__(self, api_key=JOTFORM_API_KEY, base_url=JOTFORM_BASE_URL,
+                 pool_size=JOTFORM_POOL_SIZE, rate_limiter=None,
+                 retry_policy=None, circuit_breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Un solo breaker por cliente: todos los workers se pausan juntos
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        # Keep-alive: una conexión TCP+TLS reutilizada por worker concurrente
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"APIKEY": self.api_key})
+
+    def request(self, method, path, **kwargs):
+        """Ejecutar un request respetando el rate limit compartido, con reintentos y circuit breaker"""
+        url = f"{self.base_url}{path}"
+        attempt = 0
+
+        while True:
+            is_trial = self.circuit_breaker.before_request()
+            outcome_recorded = False
+
+            try:
+                self.rate_limiter.acquire()
+
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    if is_transient_error(e):
+                        self.circuit_breaker.record_failure()
+                        outcome_recorded = True
+                    if not self.retry_policy.should_retry(method, attempt, exc=e):
+                        raise
+                    delay = self.retry_policy.delay(attempt)
+                else:
+                    if response.status_code in TRANSIENT_STATUSES:
+                        self.circuit_breaker.record_failure()
+                    else:
+                        self.circuit_breaker.record_success()
+                    outcome_recorded = True
+
+                    self.rate_limiter.update_from_headers(response.headers)
+
+                    if not self.retry_policy.should_retry(method, attempt, response=response):
+                        return response
+                    delay = self.retry_policy.delay(attempt, response)
+            finally:
+                # Request de prueba sin resultado (error no transitorio, interrupción):
+                # liberar el turno para que otro request pueda probar el API
+                if is_trial and not outcome_recorded:
+                    self.circuit_breaker.release_trial()
+
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+def get_jotform_client():
+    """Cliente único compartido: mismo pool de conexiones para todas las clases"""
+    global _shared_client
+
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = JotFormClient()
+        return _shared_client
@@ -0,0 +1,142 @@
+"""
+Mailer - Pool de sesiones SMTP autenticadas para campañas de email
+Reutiliza conexiones (una sola negociación TLS + login) y reconecta si se caen
+"""
+
+import queue
+import smtplib
+import threading
+
+from config import (
+    SMTP_SERVER, SMTP_PORT, GMAIL_USER, GMAIL_PASSWORD,
+    SMTP_POOL_SIZE, SMTP_MAX_MESSAGES_PER_CONNECTION
+)
+
+# Errores de conexión tras los cuales la sesión se descarta y se reintenta con una nueva
+RECONNECT_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    ConnectionError,
+    TimeoutError
+)
+
+def _is_reconnect_error(exc):
+    """Conexión caída o 421 (servicio no disponible, el servidor cierra la sesión)"""
+    if isinstance(exc, RECONNECT_ERRORS):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code == 421
+
+class _PooledSession:
+    """Sesión SMTP autenticada con contador de mensajes enviados"""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+
+class SMTPMailer:
+    """Pool de sesiones SMTP reutilizables durante toda una campaña"""
+
+    def __init__(self, smtp_server=SMTP_SERVER, smtp_port=SMTP_PORT,
+                 email_user=GMAIL_USER, email_password=GMAIL_PASSWORD,
+                 pool_size=SMTP_POOL_SIZE, max_messages_per_connection=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 use_tls=True, timeout=30):
+        """
+        Args:
+            pool_size: Máximo de sesiones SMTP abiertas a la vez
+            max_messages_per_connection: Reciclar la sesión tras N mensajes (0 = sin límite)
+            use_tls: Negociar STARTTLS tras conectar
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.email_user = email_user
+        self.email_password = email_password
+        self.max_messages_per_connection = max_messages_per_connection
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+        # Sesiones libres; el semáforo limita las abiertas (libres + en uso)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, pool_size))
+        self._closed = False
+
+    def _connect(self):
+        """Abrir una sesión nueva: conexión, STARTTLS y login"""
+        smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.email_user and self.email_password:
+                smtp.login(self.email_user, self.email_password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        return _PooledSession(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _acquire(self, fresh=False):
+        """Sesión libre del pool o una nueva; fresh=True siempre abre una nueva"""
+        self._slots.acquire()
+        if not fresh:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, session, broken=False):
+        recycle = (
+            self.max_messages_per_connection
+            and session.sent >= self.max_messages_per_connection
+        )
+
+        if broken or recycle or self._closed:
+            self._quit(session.smtp)
+        else:
+            self._idle.put(session)
+
+        self._slots.release()
+
+    def send_message(self, message):
+        """Enviar un mensaje usando una sesión del pool (reconecta una vez si la sesión murió)"""
+        for attempt in range(2):
+            # El reintento abre una conexión nueva: las otras sesiones libres llevan el mismo
+            # tiempo inactivas y probablemente también fueron cerradas por el servidor
+            session = self._acquire(fresh=attempt > 0)
+            try:
+                session.smtp.send_message(message)
+            except Exception as e:
+                self._release(session, broken=True)
+                if attempt == 1 or not _is_reconnect_error(e):
+                    raise
+                continue
+
+            session.sent += 1
+            self._release(session)
+            return
+
+    def close(self):
+        """Cerrar todas las sesiones libres"""
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(session.smtp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
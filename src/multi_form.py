@@ -0,0 +1,216 @@
+"""
+Multi Form Runner - Análisis, monitoreo y prefill sobre varios formularios a la vez
+Los formularios (clones regionales del 5REC) comparten el pool HTTP y el rate limit del API
+"""
+
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from openpyxl.styles import Font, PatternFill, Alignment
+
+from config import FORM_IDS, MULTI_FORM_WORKERS
+from excel_stream_writer import StreamingExcelWriter
+from excel_generator import ExcelPrefillGenerator, LINKS_COLUMNS
+from form_analyzer import JotFormAnalyzer
+from form_monitor_v2 import FormMonitorV2, STATUS_TABLE_COLUMNS
+from prefill_engine_v2 import PrefillEngineV2
+
+HEADER_STYLE = {
+    'font': Font(bold=True, color="FFFFFF"),
+    'fill': PatternFill(start_color="2C5AA0", end_color="2C5AA0", fill_type="solid"),
+    'alignment': Alignment(horizontal="center", vertical="center")
+}
+
+class MultiFormRunner:
+    """Ejecuta el pipeline 5REC para una lista de formularios en paralelo"""
+
+    def __init__(self, form_ids=None, max_forms=MULTI_FORM_WORKERS):
+        self.form_ids = list(dict.fromkeys(form_ids or FORM_IDS))
+        self.max_forms = max(1, max_forms)
+        self.output_dir = Path("../outputs")
+
+    def _run_all(self, run_form):
+        """Ejecutar run_form(form_id) por formulario; un error no detiene a los demás"""
+        def run_safe(form_id):
+            try:
+                return run_form(form_id)
+            except Exception as e:
+                print(f"❌ Formulario {form_id}: error inesperado: {e}")
+                traceback.print_exc()
+                return {'form_id': form_id, 'success': False, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_forms, len(self.form_ids))) as executor:
+            return list(executor.map(run_safe, self.form_ids))
+
+    def _analyze_form(self, form_id):
+        analyzer = JotFormAnalyzer(form_id)
+        success = analyzer.run_complete_analysis()
+        analysis = analyzer.analysis_results
+
+        return {
+            'form_id': form_id,
+            'success': success,
+            'title': analyzer.form_data.get('title', 'N/A'),
+            'status': analyzer.form_data.get('status', 'N/A'),
+            'total_fields': analysis.get('total_fields', 0),
+            'required_fields': analysis.get('required_fields', 0),
+            'prefillable_fields': analysis.get('prefillable_fields', 0)
+        }
+
+    def _monitor_form(self, form_id, incremental):
+        monitor = FormMonitorV2(form_id)
+        success = monitor.run_complete_monitoring(incremental=incremental)
+        summary = monitor.run_summary
+
+        return {
+            'form_id': form_id,
+            'success': success,
+            'submissions': summary.get('submissions', 0),
+            'completed': summary.get('completed', 0),
+            'with_pending_prefills': summary.get('with_pending_prefills', 0),
+            'status_rows': monitor.status_rows
+        }
+
+    def _prefill_form(self, form_id, send_emails, excel_path):
+        engine = PrefillEngineV2(form_id)
+        try:
+            success = engine.run_complete_workflow(
+                send_emails=send_emails, generate_excel=True, excel_path=excel_path
+            )
+        finally:
+            engine.close_mailer()
+            engine.prefill_index.close()
+
+        results = engine.results
+        return {
+            'form_id': form_id,
+            'success': success,
+            'organizations': len(results),
+            'successful_prefills': sum(1 for r in results if r['prefill_success']),
+            'successful_emails': sum(1 for r in results if r['email_success']),
+            'results': results
+        }
+
+    def _input_for_form(self, form_id, shared_input):
+        """Excel de entrada con el ID del formulario en el nombre, o el archivo compartido"""
+        form_inputs = sorted(Path("../inputs").glob(f"*{form_id}*.xlsx"))
+        form_inputs = [f for f in form_inputs if not f.name.startswith('~')]
+        return form_inputs[0] if form_inputs else shared_input
+
+    def run_analysis(self):
+        print(f"🔬 Analizando {len(self.form_ids)} formularios...")
+        summaries = self._run_all(self._analyze_form)
+        return self.write_consolidated_workbook('ANALISIS', summaries, [
+            ('Formulario ID', 'form_id'), ('Título', 'title'), ('Estado', 'status'),
+            ('Total Campos', 'total_fields'), ('Campos Requeridos', 'required_fields'),
+            ('Campos Prefill-ables', 'prefillable_fields')
+        ])
+
+    def run_monitoring(self, incremental=None):
+        print(f"🔍 Monitoreando {len(self.form_ids)} formularios...")
+        summaries = self._run_all(lambda form_id: self._monitor_form(form_id, incremental))
+
+        # Tabla de estado de todas las empresas, con el formulario como primera columna
+        status_rows = [
+            [summary['form_id']] + list(row)
+            for summary in summaries
+            for row in summary.get('status_rows', [])
+        ]
+        return self.write_consolidated_workbook('MONITOREO', summaries, [
+            ('Formulario ID', 'form_id'), ('Submissions', 'submissions'),
+            ('Completados', 'completed'), ('Total con Prefills Pendientes', 'with_pending_prefills')
+        ], detail=('📊 ESTADO EMPRESAS', ['Formulario ID'] + STATUS_TABLE_COLUMNS, status_rows))
+
+    def run_prefill(self, send_emails=False):
+        print(f"🚀 Prefill en {len(self.form_ids)} formularios...")
+
+        # Selección interactiva del Excel compartido una sola vez, antes de abrir los threads
+        shared_input = None
+        if any(self._input_for_form(form_id, None) is None for form_id in self.form_ids):
+            selector = PrefillEngineV2()
+            shared_input = selector.select_excel_file()
+            selector.prefill_index.close()
+            if shared_input is None:
+                return None
+
+        inputs = {form_id: self._input_for_form(form_id, shared_input) for form_id in self.form_ids}
+        summaries = self._run_all(
+            lambda form_id: self._prefill_form(form_id, send_emails, inputs[form_id])
+        )
+
+        generator = ExcelPrefillGenerator()
+        link_rows = [
+            [summary['form_id']] + generator._build_link_row(idx, result)
+            for summary in summaries
+            for idx, result in enumerate(summary.get('results', []), 1)
+        ]
+        return self.write_consolidated_workbook('PREFILL', summaries, [
+            ('Formulario ID', 'form_id'), ('Organizaciones', 'organizations'),
+            ('Prefills Exitosos', 'successful_prefills'), ('Emails Enviados', 'successful_emails')
+        ], detail=('🔗 LINKS PREFILL', ['Formulario ID'] + LINKS_COLUMNS, link_rows))
+
+    def write_consolidated_workbook(self, kind, summaries, columns, detail=None):
+        """
+        Libro consolidado: una fila por formulario y, opcionalmente, el detalle de todos
+
+        Args:
+            kind: Tipo de ejecución (parte del nombre del archivo)
+            summaries: Resúmenes por formulario
+            columns: Lista (encabezado, llave del resumen)
+            detail: (nombre de hoja, encabezados, filas) o None
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = self.output_dir / f"MULTI_FORM_{kind}_{timestamp}.xlsx"
+
+        with StreamingExcelWriter(filepath) as writer:
+            sheet = writer.add_sheet('📋 RESUMEN', column_widths={'A': 20, 'B': 35}, freeze_panes='A2')
+            sheet.write_header([header for header, _ in columns] + ['Resultado'], **HEADER_STYLE)
+
+            for summary in summaries:
+                result = '✅ OK' if summary.get('success') else f"❌ {summary.get('error', 'Con errores')}"
+                sheet.append([summary.get(key, 'N/A') for _, key in columns] + [result])
+
+            if detail:
+                title, headers, rows = detail
+                detail_sheet = writer.add_sheet(title, column_widths={'A': 20, 'B': 40}, freeze_panes='B2')
+                detail_sheet.write_header(headers, **HEADER_STYLE)
+                detail_sheet.append_many(rows)
+
+        successful = sum(1 for summary in summaries if summary.get('success'))
+        print("\n" + "=" * 70)
+        print(f"✅ MULTI-FORMULARIO {kind}: {successful}/{len(summaries)} formularios OK")
+        print(f"📊 Libro consolidado: {filepath}")
+        print("=" * 70)
+
+        return filepath
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Pipeline 5REC sobre varios formularios")
+    parser.add_argument('mode', choices=['analyze', 'monitor', 'prefill'], help="Etapa a ejecutar")
+    parser.add_argument(
+        '--forms',
+        default=None,
+        help="IDs de formulario separados por coma (por defecto FORM_IDS del .env)"
+    )
+    parser.add_argument('--send-emails', action='store_true', help="Prefill: enviar emails además del Excel")
+    args = parser.parse_args()
+
+    form_ids = [form_id.strip() for form_id in args.forms.split(',') if form_id.strip()] if args.forms else None
+    runner = MultiFormRunner(form_ids)
+
+    try:
+        if args.mode == 'analyze':
+            runner.run_analysis()
+        elif args.mode == 'monitor':
+            runner.run_monitoring()
+        else:
+            runner.run_prefill(send_emails=args.send_emails)
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Ejecución cancelada por usuario")
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,58 @@ Sistema completo de prefill con mapeo limpio, validación y emails
 """
 
 import pandas as pd
-import requests
-import smtplib
+import numpy as np
 import json
+import argparse
+import re
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+from functools import lru_cache
 from pathlib import Path
-from config import JOTFORM_API_KEY, FORM_ID, GMAIL_USER, GMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT, FROM_NAME
+from config import JOTFORM_API_KEY, FORM_ID, GMAIL_USER, GMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT, FROM_NAME, MAX_CONCURRENT_REQUESTS, PREFILL_BATCH_SIZE, EXCEL_CHUNK_SIZE
+from jotform_client import get_jotform_client
 from excel_generator import ExcelPrefillGenerator
+from mailer import SMTPMailer
+from email_template import CampaignEmailTemplate
+from email_dispatcher import EmailDispatcher
+from campaign_ledger import CampaignLedger, row_key
+from prefill_index import PrefillIndex, organization_key, prefill_fingerprint
+from excel_loader import read_excel_sheet, iter_excel_chunks
+from report_stream import PrefillReportStream
+from artifact_manifest import artifact_pattern, latest_artifact, load_compiled, save_compiled
+
+# Excel column holding the organization's NIT (tax id), e.g. 'NIT' or 'NIT Empresa'
+NIT_COLUMN_PATTERN = re.compile(r'\bNIT\b', re.IGNORECASE)
+
+# First-column markers of metadata rows in the input sheet
+METADATA_ROW_PATTERN = '|'.join(re.escape(keyword) for keyword in ['TIPO:', 'ID:', 'DESCRIPCIÓN'])
+
+def _clean_text(value):
+    return str(value).strip()
+
+@lru_cache(maxsize=8)
+def _find_nit_column(columns):
+    """First column whose name mentions NIT (resolved once per set of columns)"""
+    return next((col for col in columns if NIT_COLUMN_PATTERN.search(str(col))), None)
+
+PREFILL_ACTION_LABELS = {
+    'created': 'nuevo',
+    'updated': 'actualizado',
+    'reused': 'sin cambios, reutilizado'
+}
 
 class PrefillEngineV2:
     """Motor de prefill optimizado usando mapeo limpio y API validada"""
     
-    def __init__(self):
+    def __init__(self, form_id=None):
         self.api_key = JOTFORM_API_KEY
-        self.form_id = FORM_ID
-        self.base_url = "https://api.jotform.com"
+        self.form_id = form_id or FORM_ID
+        # Multi-form mode: form ID in output filenames so concurrent runs don't collide
+        self.output_tag = f"{form_id}_" if form_id else ""
+        self.client = get_jotform_client()
         
         # Email configuration
         self.email_config = {
@@ -38,23 +71,46 @@ class PrefillEngineV2:
         self.excel_data = pd.DataFrame()
         self.results = []
         
+        # Local index organization -> submission: reruns don't duplicate submissions
+        self.prefill_index = PrefillIndex()
+        
+        # Concurrency: cap on in-flight API requests
+        self.max_workers = MAX_CONCURRENT_REQUESTS
+        
+        # One lock per prefill key: index lookup, POST and register run as one step
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        
+        # Workers print each row's log block whole, one block at a time
+        self._print_lock = threading.Lock()
+        
+        # Batch mode: rows per PUT /form/{id}/submissions request (<= 1 disables it)
+        self.batch_size = PREFILL_BATCH_SIZE
+        
+        # SMTP session pool, opened on first email
+        self.mailer = None
+        self._mailer_lock = threading.Lock()
+        
+        # Campaign email template, prepared on first email
+        self.email_template = None
+        
         # Excel generator for output
-        self.excel_generator = ExcelPrefillGenerator()
+        self.excel_generator = ExcelPrefillGenerator(self.output_tag)
         
     def load_clean_mapping(self):
         """Load validated clean mapping"""
         print("🗺️  Cargando mapeo limpio validado...")
         
         try:
-            # Find latest mapping files (try different formats)
-            outputs_dir = Path("../outputs")
+            # Latest mapping files from the artifact manifest (try different formats).
+            # Each form only sees its own files: untagged patterns don't match another
+            # form's tagged mapping (artifact_pattern)
             
             # First try to find SIMPLE_MAPPING files
-            mapping_files = list(outputs_dir.glob("SIMPLE_MAPPING_*.json"))
+            # (provided from outside the repo: always the newest file by mtime)
+            latest_mapping, _ = latest_artifact(artifact_pattern("SIMPLE_MAPPING", self.output_tag, ".json"), external=True)
             
-            if mapping_files:
-                latest_mapping = max(mapping_files, key=lambda x: x.stat().st_mtime)
-                
+            if latest_mapping:
                 with open(latest_mapping, 'r', encoding='utf-8') as f:
                     self.clean_mapping = json.load(f)
                 
@@ -63,48 +119,56 @@ class PrefillEngineV2:
                 return True
             
             # If no SIMPLE_MAPPING, try FORM_COMPLETE files
-            complete_files = list(outputs_dir.glob("FORM_COMPLETE_*.json"))
+            latest_complete, complete_sha1 = latest_artifact(artifact_pattern("FORM_COMPLETE", self.output_tag, ".json"))
             
-            if complete_files:
-                latest_complete = max(complete_files, key=lambda x: x.stat().st_mtime)
-                
-                with open(latest_complete, 'r', encoding='utf-8') as f:
-                    form_data = json.load(f)
+            if latest_complete:
+                # Mapping already derived from this exact file: skip parsing the questions
+                self.clean_mapping = load_compiled("clean_mapping", complete_sha1)
                 
-                # Extract field mapping from complete form data
-                self.clean_mapping = {}
-                questions = form_data.get('questions', {})
-                
-                for qid, question in questions.items():
-                    # Skip non-input fields
-                    field_type = question.get('type', '')
-                    if field_type in ['control_head', 'control_pagebreak', 'control_button', 'control_fileupload']:
-                        continue
-                    
-                    # Use field name or text as mapping key
-                    field_name = question.get('name', '')
-                    field_text = question.get('text', '')
+                if self.clean_mapping is None:
+                    with open(latest_complete, 'r', encoding='utf-8') as f:
+                        form_data = json.load(f)
                     
-                    if field_name:
-                        # Use field name as key for mapping
-                        self.clean_mapping[field_name] = qid
-                    elif field_text:
-                        # Use field text as key (clean it) - sin limitar longitud
-                        clean_text = field_text.replace('\n', ' ').strip()
-                        self.clean_mapping[clean_text] = qid
+                    self.clean_mapping = self._mapping_from_questions(form_data.get('questions', {}))
+                    save_compiled("clean_mapping", complete_sha1, self.clean_mapping)
                 
                 print(f"✅ Mapeo generado desde datos completos: {len(self.clean_mapping)} campos")
                 print(f"   Archivo: {latest_complete.name}")
                 print(f"   Campos mapeables: {list(self.clean_mapping.keys())[:5]}...")
                 return True
             
-            print("❌ No se encontraron archivos de mapeo (SIMPLE_MAPPING o FORM_COMPLETE)")
+            print(f"❌ No se encontraron archivos de mapeo (SIMPLE_MAPPING_{self.output_tag}* o FORM_COMPLETE_{self.output_tag}*)")
             return False
                 
         except Exception as e:
             print(f"❌ Error cargando mapeo: {e}")
             return False
     
+    @staticmethod
+    def _mapping_from_questions(questions):
+        """Extract field mapping (field name/text -> qid) from complete form data"""
+        clean_mapping = {}
+        
+        for qid, question in questions.items():
+            # Skip non-input fields
+            field_type = question.get('type', '')
+            if field_type in ['control_head', 'control_pagebreak', 'control_button', 'control_fileupload']:
+                continue
+            
+            # Use field name or text as mapping key
+            field_name = question.get('name', '')
+            field_text = question.get('text', '')
+            
+            if field_name:
+                # Use field name as key for mapping
+                clean_mapping[field_name] = qid
+            elif field_text:
+                # Use field text as key (clean it) - sin limitar longitud
+                clean_text = field_text.replace('\n', ' ').strip()
+                clean_mapping[clean_text] = qid
+        
+        return clean_mapping
+    
     def find_excel_files(self):
         """Find all Excel files in inputs directory"""
         inputs_dir = Path("../inputs")
@@ -166,19 +230,11 @@ class PrefillEngineV2:
         print(f"📊 Cargando datos desde {excel_path}...")
         
         try:
-            # Try main data sheet
-            df = pd.read_excel(excel_path, sheet_name="📊 DATOS PREFILL")
+            # Main data sheet without metadata rows (calamine engine / Parquet cache when available)
+            filtered_rows = read_excel_sheet(excel_path, "📊 DATOS PREFILL", prepare=self._drop_metadata_rows)
             
-            # Filter out metadata rows
-            filtered_rows = []
-            for idx, row in df.iterrows():
-                first_value = str(row.iloc[0]) if len(row) > 0 else ""
-                # Skip rows that look like metadata
-                if not any(keyword in first_value.upper() for keyword in ['TIPO:', 'ID:', 'DESCRIPCIÓN']):
-                    filtered_rows.append(row)
-            
-            if filtered_rows:
-                self.excel_data = pd.DataFrame(filtered_rows).reset_index(drop=True)
+            if not filtered_rows.empty:
+                self.excel_data = filtered_rows
                 print(f"✅ Datos cargados: {len(self.excel_data)} filas, {len(self.excel_data.columns)} columnas")
                 
                 # Show sample data
@@ -196,60 +252,290 @@ class PrefillEngineV2:
             print(f"❌ Error cargando Excel: {e}")
             return False
     
-    def create_prefill_submission(self, data_row):
-        """Create prefilled submission using validated API method"""
-        # Prepare form data using clean mapping
-        form_data = {}
-        mapped_fields = 0
+    @staticmethod
+    def _drop_metadata_rows(df):
+        """Filter out metadata rows: one vectorized pass over the first column"""
+        if len(df.columns) == 0:
+            return df.iloc[0:0]
         
-        for excel_column, field_id in self.clean_mapping.items():
-            if excel_column in data_row:
-                value = data_row[excel_column]
-                
-                # Clean and validate value
-                if pd.isna(value) or str(value).strip() == '':
-                    continue  # Skip empty values
-                
-                # Format value properly
-                clean_value = str(value).strip()
-                form_data[f"submission[{field_id}]"] = clean_value
-                mapped_fields += 1
+        first_values = df.iloc[:, 0].astype(str).str.upper()
+        is_metadata = first_values.str.contains(METADATA_ROW_PATTERN, regex=True)
+        return df[~is_metadata]
+    
+    def _compile_payload_plan(self, columns):
+        """
+        Compile the clean mapping against the DataFrame columns once
         
-        # API call
-        url = f"{self.base_url}/form/{self.form_id}/submissions?apiKey={self.api_key}"
+        Returns:
+            List of (column position, 'submission[qid]') in clean mapping order
+        """
+        positions = {}
+        for position, column in enumerate(columns):
+            positions.setdefault(column, position)
         
-        try:
-            response = requests.post(url, data=form_data, timeout=30)
-            data = response.json()
+        return [
+            (positions[excel_column], f"submission[{field_id}]")
+            for excel_column, field_id in self.clean_mapping.items()
+            if excel_column in positions
+        ]
+    
+    def build_payloads(self, df):
+        """
+        Submission payloads for every row in one column-wise pass
+        
+        Empty values (NaN or blank after strip) are skipped, like the per-row mapping did.
+        
+        Returns:
+            Dict row label -> (form_data, mapped_fields)
+        """
+        payloads = [{} for _ in range(len(df))]
+        
+        for position, field in self._compile_payload_plan(df.columns):
+            column = df.iloc[:, position]
+            # str() per value keeps the exact text of the row-by-row mapping (dates, floats)
+            values = column.astype(object).map(_clean_text, na_action='ignore')
+            valid = column.notna() & (values != '')
             
-            if response.status_code == 200 and data.get('responseCode') == 200:
-                submission_id = data['content']['submissionID']
-                edit_url = f"https://www.jotform.com/edit/{submission_id}"
-                
-                return {
-                    'success': True,
-                    'submission_id': submission_id,
-                    'edit_url': edit_url,
-                    'mapped_fields': mapped_fields,
-                    'error': None
-                }
-            else:
-                return {
-                    'success': False,
-                    'submission_id': None,
-                    'edit_url': None,
-                    'mapped_fields': mapped_fields,
-                    'error': data.get('message', f'HTTP {response.status_code}')
-                }
-                
-        except Exception as e:
+            for row_position, value in zip(np.flatnonzero(valid.to_numpy()), values[valid].tolist()):
+                payloads[row_position][field] = value
+        
+        return {label: (form_data, len(form_data)) for label, form_data in zip(df.index, payloads)}
+    
+    def _build_form_data(self, data_row):
+        """Map a single Excel row to submission[qid] fields using the clean mapping"""
+        return next(iter(self.build_payloads(data_row.to_frame().T).values()))
+    
+    def _organization_key(self, data_row):
+        """Stable prefill identity (company name + NIT + contact email), None without company and NIT"""
+        empresa = data_row.get('Nombre Empresa/Organización')
+        empresa = '' if pd.isna(empresa) else str(empresa).strip()
+        
+        nit = ''
+        nit_column = _find_nit_column(tuple(data_row.index))
+        if nit_column is not None and not pd.isna(data_row[nit_column]):
+            nit = data_row[nit_column]
+            if isinstance(nit, str):
+                nit = nit.strip()
+        
+        if not empresa and not nit:
+            return None
+        
+        # Each contact row of the same organization gets its own prefill
+        contact = data_row.get('Email Destinatario')
+        contact = None if pd.isna(contact) else contact
+        
+        return organization_key(empresa, nit, contact)
+    
+    def _prepare_prefill(self, data_row, payload=None):
+        """Form data plus index lookup for a row: (form_data, mapped_fields, org_key, fingerprint, existing)"""
+        # Prepare form data using clean mapping (precompiled payload when available)
+        form_data, mapped_fields = payload or self._build_form_data(data_row)
+        
+        org_key = self._organization_key(data_row)
+        fingerprint = prefill_fingerprint(org_key, form_data) if org_key else None
+        existing = self.prefill_index.get(self.form_id, org_key) if org_key else None
+        
+        return form_data, mapped_fields, org_key, fingerprint, existing
+    
+    def _key_lock(self, org_key):
+        """Lock shared by every worker handling the same prefill key (no-op without key)"""
+        if org_key is None:
+            return nullcontext()
+        
+        with self._key_locks_lock:
+            return self._key_locks.setdefault(org_key, threading.Lock())
+    
+    def create_prefill_submission(self, data_row, payload=None):
+        """
+        Create prefilled submission using validated API method
+        
+        Idempotent across runs: rows already indexed with the same fingerprint reuse their
+        submission without API calls; changed rows update the existing submission.
+        Rows with the same key are serialized, so concurrent workers never both create one.
+        
+        Args:
+            payload: (form_data, mapped_fields) from build_payloads, built from the row if omitted
+        """
+        with self._key_lock(self._organization_key(data_row)):
+            return self._create_or_update_prefill(data_row, payload)
+    
+    def _create_or_update_prefill(self, data_row, payload=None):
+        """Index lookup, then reuse / update / create (callers hold the row's key lock)"""
+        form_data, mapped_fields, org_key, fingerprint, existing = self._prepare_prefill(data_row, payload)
+        
+        if existing and existing['fingerprint'] == fingerprint:
             return {
-                'success': False,
-                'submission_id': None,
-                'edit_url': None,
+                'success': True,
+                'action': 'reused',
+                'submission_id': existing['submission_id'],
+                'edit_url': existing['edit_url'],
                 'mapped_fields': mapped_fields,
-                'error': str(e)
+                'error': None
             }
+        
+        if existing:
+            # Data changed: edit the existing submission instead of creating a new one
+            try:
+                response = self.client.post(f"/submission/{existing['submission_id']}", data=form_data, timeout=30)
+                data = response.json()
+            except Exception as e:
+                return self._prefill_error(mapped_fields, str(e))
+            
+            if response.status_code == 200 and data.get('responseCode') == 200:
+                return self._register_prefill('updated', existing['submission_id'], mapped_fields, org_key, fingerprint)
+            
+            if response.status_code != 404 and data.get('responseCode') != 404:
+                return self._prefill_error(mapped_fields, data.get('message', f'HTTP {response.status_code}'))
+            # 404: submission deleted in JotForm, create it again
+        
+        return self._create_new_prefill(form_data, mapped_fields, org_key, fingerprint)
+    
+    def _create_new_prefill(self, form_data, mapped_fields, org_key, fingerprint):
+        """Create one new submission (POST) and index it"""
+        path = f"/form/{self.form_id}/submissions"
+        
+        try:
+            response = self.client.post(path, data=form_data, timeout=30)
+            data = response.json()
+        except Exception as e:
+            return self._prefill_error(mapped_fields, str(e))
+        
+        if response.status_code == 200 and data.get('responseCode') == 200:
+            submission_id = data['content']['submissionID']
+            return self._register_prefill('created', submission_id, mapped_fields, org_key, fingerprint)
+        
+        return self._prefill_error(mapped_fields, data.get('message', f'HTTP {response.status_code}'))
+    
+    def create_prefills_batch(self, data_rows, payloads=None):
+        """
+        Create new submissions for several rows with a single PUT /form/{id}/submissions
+        
+        Falls back to one POST per row only if the API rejects the batch (HTTP 4xx: nothing
+        was created). After a 5xx or an unreadable response the batch may have been created,
+        so its rows are marked failed instead of being posted again.
+        
+        Args:
+            payloads: (form_data, mapped_fields) per row from build_payloads (optional)
+        
+        Returns:
+            List of prefill results aligned with data_rows
+        """
+        payloads = payloads or [None] * len(data_rows)
+        prepared = [self._prepare_prefill(row, payload) for row, payload in zip(data_rows, payloads)]
+        
+        # Batch endpoint takes a JSON array of {qid: value} objects
+        payload = [
+            {field[len('submission['):-1]: value for field, value in form_data.items()}
+            for form_data, *_ in prepared
+        ]
+        
+        try:
+            response = self.client.put(f"/form/{self.form_id}/submissions", json=payload, timeout=60)
+        except Exception as e:
+            return [self._prefill_error(mapped_fields, str(e)) for _, mapped_fields, *_ in prepared]
+        
+        try:
+            data = response.json()
+        except ValueError:
+            # Non-JSON body (e.g. a proxy error page): judged by the HTTP status alone
+            data = {}
+        
+        if 400 <= response.status_code < 500:
+            # Batch rejected (nothing created): one POST per row
+            print(f"   ⚠️  Batch rechazado ({data.get('message', f'HTTP {response.status_code}')}) - creando {len(prepared)} submissions individualmente")
+            return [
+                self._create_new_prefill(form_data, mapped_fields, org_key, fingerprint)
+                for form_data, mapped_fields, org_key, fingerprint, _ in prepared
+            ]
+        
+        if response.status_code != 200 or data.get('responseCode') != 200:
+            # Outcome unknown: posting again could duplicate submissions
+            error = f"Batch sin confirmar ({data.get('message', f'HTTP {response.status_code}')}): revisar en JotForm antes de reintentar"
+            print(f"   ⚠️  {error} - {len(prepared)} filas marcadas con error")
+            return [self._prefill_error(mapped_fields, error) for _, mapped_fields, *_ in prepared]
+        
+        # Returned submissions come back in payload order
+        content = data.get('content')
+        if not isinstance(content, list) or len(content) != len(prepared):
+            error = 'Respuesta batch inesperada: no se pueden asociar submissions a filas'
+            return [self._prefill_error(mapped_fields, error) for _, mapped_fields, *_ in prepared]
+        
+        return [
+            self._register_prefill('created', item['submissionID'], mapped_fields, org_key, fingerprint)
+            for (_, mapped_fields, org_key, fingerprint, _), item in zip(prepared, content)
+        ]
+    
+    def _register_prefill(self, action, submission_id, mapped_fields, org_key, fingerprint):
+        """Index a created/updated submission and build its prefill result"""
+        edit_url = f"https://www.jotform.com/edit/{submission_id}"
+        
+        if org_key:
+            self.prefill_index.put(self.form_id, org_key, fingerprint, submission_id, edit_url, mapped_fields)
+        
+        return {
+            'success': True,
+            'action': action,
+            'submission_id': submission_id,
+            'edit_url': edit_url,
+            'mapped_fields': mapped_fields,
+            'error': None
+        }
+    
+    @staticmethod
+    def _prefill_error(mapped_fields, error):
+        return {
+            'success': False,
+            'submission_id': None,
+            'edit_url': None,
+            'mapped_fields': mapped_fields,
+            'error': error
+        }
+    
+    def _create_prefills_in_batches(self, rows, batch_size, max_workers, previous_results=None, payloads=None):
+        """
+        Create the submissions of rows that need a new one, batch_size rows per request
+        
+        Rows already in the prefill index (reuse/update) or completed in a previous run
+        (resume) are left to the per-row path.
+        
+        Returns:
+            Dict row index -> prefill result
+        """
+        pending = []
+        # Same key twice: only the first row goes in a batch, the rest reuse it per row
+        batched_keys = set()
+        for idx, row in rows:
+            previous = (previous_results or {}).get(row_key(*self._row_contact(idx, row)))
+            if previous and previous.get('prefill_success'):
+                continue
+            
+            org_key = self._organization_key(row)
+            if org_key and (org_key in batched_keys or self.prefill_index.get(self.form_id, org_key)):
+                continue
+            
+            batched_keys.add(org_key)
+            pending.append((idx, row))
+        
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        if not batches:
+            return {}
+        
+        print(f"📦 Modo batch: {len(pending)} submissions nuevas en {len(batches)} requests")
+        
+        batch_results = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            created = executor.map(
+                lambda batch: self.create_prefills_batch(
+                    [row for _, row in batch],
+                    [payloads[idx] for idx, _ in batch] if payloads else None
+                ),
+                batches
+            )
+            for batch, results in zip(batches, created):
+                for (idx, _), prefill_result in zip(batch, results):
+                    batch_results[idx] = prefill_result
+        
+        return batch_results
     
     def load_image_as_base64(self, image_path):
         """Load image and convert to base64 for inline embedding"""
@@ -261,199 +547,258 @@ class PrefillEngineV2:
             print(f"⚠️  Error cargando imagen {image_path}: {e}")
             return None
     
+    def _get_mailer(self):
+        """Lazily open the SMTP session pool shared by the whole campaign"""
+        with self._mailer_lock:
+            if self.mailer is None:
+                self.mailer = SMTPMailer(
+                    smtp_server=self.email_config['smtp_server'],
+                    smtp_port=self.email_config['smtp_port'],
+                    email_user=self.email_config['email_user'],
+                    email_password=self.email_config['email_password']
+                )
+            return self.mailer
+    
+    def close_mailer(self):
+        """Close pooled SMTP sessions at the end of a campaign"""
+        with self._mailer_lock:
+            if self.mailer is not None:
+                self.mailer.close()
+                self.mailer = None
+    
+    def _get_email_template(self):
+        """Prepared campaign email (images encoded once per run)"""
+        with self._mailer_lock:
+            if self.email_template is None:
+                self.email_template = CampaignEmailTemplate(
+                    from_name=FROM_NAME,
+                    from_email=self.email_config['email_user']
+                )
+            return self.email_template
+    
     def send_email(self, to_email, empresa, edit_url, mapped_fields):
         """Send email with prefilled form URL"""
-        
-        # Create email content (original structure with CID images)
-        subject = f"Formulario 5REC Pre-llenado - {empresa}"
-        
-        html_body = f"""
-        <html>
-        <head></head>
-        <body>
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                
-                <!-- Header Image -->
-                <div style="text-align: center; margin-bottom: 20px;">
-                    <img src="cid:header_image" style="width: 100%; max-width: 600px; height: auto; display: block; margin: 0 auto;" alt="5REC Header">
-                </div>
-                
-                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
-                    <h2 style="color: #2c5aa0; margin: 0;">🏢 Formulario 5REC</h2>
-                    <p style="color: #666; margin: 5px 0 0 0;">Reporte Empresarial Consolidado</p>
-                </div>
-                
-                <div style="background-color: white; padding: 30px; border-radius: 10px; border: 1px solid #e9ecef;">
-                    <h3 style="color: #333;">Estimado equipo de <strong>{empresa}</strong>,</h3>
-                    
-                    <p style="color: #666; line-height: 1.6;">
-                        Hemos preparado su formulario 5REC con <strong>{mapped_fields} campos pre-llenados</strong> 
-                        basados en la información que nos proporcionaron.
-                    </p>
-                    
-                    <div style="background-color: #e7f3ff; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <p style="margin: 0; color: #0066cc;">
-                            <strong>🔗 Acceder al formulario:</strong>
-                        </p>
-                        <div style="text-align: center; margin: 15px 0;">
-                            <a href="{edit_url}" style="text-decoration: none; display: inline-block;">
-                                <img src="cid:button_image" style="max-width: 200px; height: auto; border: none;" alt="Acceder al Formulario 5REC">
-                            </a>
-                        </div>
-                        <div style="text-align: center; margin-top: 10px;">
-                            <a href="{edit_url}" 
-                               style="display: inline-block; background-color: #2c5aa0; color: white; 
-                                      padding: 12px 25px; text-decoration: none; border-radius: 5px; 
-                                      font-weight: bold;">
-                                ▶️ Abrir Formulario Pre-llenado
-                            </a>
-                        </div>
-                    </div>
-                    
-                    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 8px; margin: 20px 0;">
-                        <p style="margin: 0; color: #666; font-size: 14px;">
-                            <strong>📝 Instrucciones:</strong><br>
-                            • El formulario ya tiene información básica de su organización<br>
-                            • Complete los campos faltantes según corresponda<br>
-                            • Guarde y envíe cuando esté completo<br>
-                            • El enlace es único y personal para su organización
-                        </p>
-                    </div>
-                    
-                    <hr style="border: none; border-top: 1px solid #e9ecef; margin: 30px 0;">
-                    
-                    <p style="color: #666; font-size: 13px; text-align: center;">
-                        <strong>Equipo 5REC</strong><br>
-                        Este enlace es válido y puede ser usado para completar su reporte.<br>
-                        Si tiene preguntas, no dude en contactarnos.
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
         try:
-            # Create message with related content for embedded images
-            message = MIMEMultipart("related")
-            message["Subject"] = subject
-            message["From"] = f"{FROM_NAME} <{self.email_config['email_user']}>"
-            message["To"] = to_email
-            
-            # Create alternative container for HTML content
-            msg_alternative = MIMEMultipart("alternative")
-            
-            # Add HTML content
-            html_part = MIMEText(html_body, "html")
-            msg_alternative.attach(html_part)
-            
-            # Attach the alternative container to main message
-            message.attach(msg_alternative)
-            
-            # Load and attach images with Content-ID
-            header_img_path = Path("../img/5REC Franja.png")
-            button_img_path = Path("../img/Imagen 5REC formulario.png")
+            # Fill the per-recipient fields of the prepared template (original structure with CID images)
+            message = self._get_email_template().build_message(to_email, empresa, edit_url, mapped_fields)
             
-            # Attach header image
-            if header_img_path.exists():
-                with open(header_img_path, 'rb') as f:
-                    img_data = f.read()
-                    img = MIMEImage(img_data)
-                    img.add_header('Content-ID', '<header_image>')
-                    img.add_header('Content-Disposition', 'inline', filename='5REC_Franja.png')
-                    message.attach(img)
-            
-            # Attach button image  
-            if button_img_path.exists():
-                with open(button_img_path, 'rb') as f:
-                    img_data = f.read()
-                    img = MIMEImage(img_data)
-                    img.add_header('Content-ID', '<button_image>')
-                    img.add_header('Content-Disposition', 'inline', filename='Imagen_5REC_formulario.png')
-                    message.attach(img)
-            
-            # Send email
-            with smtplib.SMTP(self.email_config['smtp_server'], self.email_config['smtp_port']) as server:
-                server.starttls()
-                server.login(self.email_config['email_user'], self.email_config['email_password'])
-                server.send_message(message)
+            # Send email through the pooled SMTP sessions
+            self._get_mailer().send_message(message)
             
             return {'success': True, 'error': None}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def process_all_organizations(self, send_emails=False):
-        """Process all organizations in Excel data"""
-        print(f"\n🚀 Procesando {len(self.excel_data)} organizaciones...")
-        print(f"📧 Modo envío de emails: {'ACTIVADO' if send_emails else 'DESACTIVADO - Solo generando tabla Excel'}")
+    def _row_contact(self, idx, row):
+        """Organization name and recipient email of a row ('Sin email' when missing)"""
+        empresa = row.get('Nombre Empresa/Organización', f'Organización_{idx}')
+        email_destinatario = row.get('Email Destinatario', '')
         
-        for idx, row in self.excel_data.iterrows():
-            print(f"\n📋 Procesando organización {idx + 1}/{len(self.excel_data)}")
-            
-            # Get organization details
-            empresa = row.get('Nombre Empresa/Organización', f'Organización_{idx}')
-            email_destinatario = row.get('Email Destinatario', '')
-            
-            print(f"   🏢 Empresa: {empresa}")
-            print(f"   📧 Email: {email_destinatario}")
-            
-            # Process even without email for Excel generation
-            if pd.isna(email_destinatario) or not email_destinatario.strip():
-                print(f"   ⚠️  Sin email - procesando solo para tabla")
-                email_destinatario = 'Sin email'
+        if pd.isna(email_destinatario) or not email_destinatario.strip():
+            email_destinatario = 'Sin email'
+        
+        return empresa, email_destinatario
+    
+    def _process_organization(self, idx, row, total, send_emails=False, dispatcher=None,
+                              ledger=None, previous_results=None, batch_results=None, payloads=None):
+        """
+        Process a single organization row and return its result entry
+        
+        Args:
+            ledger: CampaignLedger where the prefill outcome is recorded as soon as it happens
+            previous_results: Ledger entries of a previous run (resume); completed rows are skipped
+            batch_results: Prefill results already created in batch mode (row index -> result)
+            payloads: Precompiled submission payloads (row index -> (form_data, mapped_fields))
+        """
+        # Buffer log lines so concurrent workers don't interleave output
+        log = [f"\n📋 Procesando organización {idx + 1}/{total}"]
+        
+        # Get organization details
+        empresa, email_destinatario = self._row_contact(idx, row)
+        
+        log.append(f"   🏢 Empresa: {empresa}")
+        log.append(f"   📧 Email: {row.get('Email Destinatario', '')}")
+        
+        # Process even without email for Excel generation
+        if email_destinatario == 'Sin email':
+            log.append(f"   ⚠️  Sin email - procesando solo para tabla")
+        
+        # Resume: reuse the submission created by a previous run instead of creating a duplicate
+        previous = (previous_results or {}).get(row_key(empresa, email_destinatario))
+        if previous and previous.get('prefill_success'):
+            result_entry = dict(previous)
             
-            # Create prefilled submission
-            print(f"   🔧 Creando submission prefilled...")
-            prefill_result = self.create_prefill_submission(row)
+            if CampaignLedger.is_complete(previous, send_emails):
+                log.append(f"   ⏭️  Ya completada en una ejecución anterior - omitida")
+            else:
+                log.append(f"   ♻️  Prefill ya creado - email en cola de envío...")
+                dispatcher.submit(
+                    result_entry,
+                    email_destinatario,
+                    empresa,
+                    previous['edit_url'],
+                    previous['mapped_fields']
+                )
             
-            result_entry = {
-                'empresa': empresa,
-                'email': email_destinatario,
-                'prefill_success': prefill_result['success'],
-                'submission_id': prefill_result.get('submission_id'),
-                'edit_url': prefill_result.get('edit_url'),
-                'mapped_fields': prefill_result.get('mapped_fields', 0),
-                'email_success': False,
-                'prefill_error': prefill_result.get('error'),
-                'email_error': None
-            }
+            self._print_log(log)
             
-            if prefill_result['success']:
-                print(f"   ✅ Prefill exitoso - {prefill_result['mapped_fields']} campos")
-                print(f"   🔗 URL: {prefill_result['edit_url']}")
-                
-                # Send email only if requested and email is valid
-                if send_emails and email_destinatario != 'Sin email':
-                    print(f"   📧 Enviando email...")
-                    email_result = self.send_email(
-                        email_destinatario, 
-                        empresa, 
-                        prefill_result['edit_url'],
-                        prefill_result['mapped_fields']
-                    )
-                    
-                    result_entry['email_success'] = email_result['success']
-                    result_entry['email_error'] = email_result.get('error')
-                    
-                    if email_result['success']:
-                        print(f"   ✅ Email enviado exitosamente")
-                    else:
-                        print(f"   ❌ Error email: {email_result['error']}")
-                else:
-                    print(f"   📊 Guardando para tabla Excel")
+            return result_entry
+        
+        # Create prefilled submission
+        if batch_results and idx in batch_results:
+            prefill_result = batch_results[idx]
+        else:
+            log.append(f"   🔧 Creando submission prefilled...")
+            prefill_result = self.create_prefill_submission(row, payloads.get(idx) if payloads else None)
+        
+        result_entry = {
+            'empresa': empresa,
+            'email': email_destinatario,
+            'prefill_success': prefill_result['success'],
+            'submission_id': prefill_result.get('submission_id'),
+            'edit_url': prefill_result.get('edit_url'),
+            'mapped_fields': prefill_result.get('mapped_fields', 0),
+            'email_success': False,
+            'prefill_error': prefill_result.get('error'),
+            'email_error': None
+        }
+        
+        if ledger:
+            ledger.record('prefill', result_entry)
+        
+        if prefill_result['success']:
+            action_label = PREFILL_ACTION_LABELS[prefill_result.get('action', 'created')]
+            log.append(f"   ✅ Prefill exitoso ({action_label}) - {prefill_result['mapped_fields']} campos")
+            log.append(f"   🔗 URL: {prefill_result['edit_url']}")
             
+            # Queue email only if requested and email is valid; the dispatcher sends it
+            # while this worker moves on to the next prefill
+            if send_emails and email_destinatario != 'Sin email':
+                log.append(f"   📧 Email en cola de envío...")
+                dispatcher.submit(
+                    result_entry,
+                    email_destinatario, 
+                    empresa, 
+                    prefill_result['edit_url'],
+                    prefill_result['mapped_fields']
+                )
             else:
-                print(f"   ❌ Error prefill: {prefill_result['error']}")
-            
-            self.results.append(result_entry)
-            
-            # Brief pause between requests
-            import time
-            time.sleep(2)
+                log.append(f"   📊 Guardando para tabla Excel")
+        
+        else:
+            log.append(f"   ❌ Error prefill: {prefill_result['error']}")
+        
+        self._print_log(log)
+        
+        return result_entry
+    
+    def _print_log(self, log):
+        """Print a worker's buffered log block without interleaving it with other workers"""
+        with self._print_lock:
+            print("\n".join(log), flush=True)
+    
+    def process_all_organizations(self, send_emails=False, max_workers=None, resume=False, batch_size=None):
+        """
+        Process all organizations in Excel data
+        
+        Args:
+            send_emails: Send an email to every organization with a successful prefill
+                (queued to an EmailDispatcher with its own concurrency and rate limit)
+            max_workers: Cap on in-flight API requests (default MAX_CONCURRENT_REQUESTS).
+                Throughput is bounded by the shared API rate limiter, not by this value.
+            resume: Skip rows already completed according to the campaign ledger
+            batch_size: Rows per batch submission request (default PREFILL_BATCH_SIZE, <= 1 = one POST per row)
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        
+        if batch_size is None:
+            batch_size = self.batch_size
+        
+        total = len(self.excel_data)
+        print(f"\n🚀 Procesando {total} organizaciones...")
+        print(f"📧 Modo envío de emails: {'ACTIVADO' if send_emails else 'DESACTIVADO - Solo generando tabla Excel'}")
+        print(f"⚡ Requests simultáneos: {max_workers}")
+        
+        ledger, previous_results, dispatcher = self._open_campaign(send_emails, resume)
+        
+        try:
+            self.results.extend(self._process_rows(
+                self.excel_data, total, send_emails, max_workers, batch_size,
+                ledger, previous_results, dispatcher
+            ))
+        finally:
+            self._close_campaign(ledger, dispatcher)
         
         return self.results
     
+    def _open_campaign(self, send_emails, resume):
+        """Ledger, resume state and email dispatcher shared by every row of a run"""
+        # Every prefill/email outcome is appended to the ledger as it happens.
+        # Resume reopens only the latest campaign; any other run starts a new ledger
+        ledger = CampaignLedger.latest(self.form_id) if resume else None
+        previous_results = None
+        
+        if ledger is not None:
+            previous_results = ledger.load()
+            completed = sum(CampaignLedger.is_complete(entry, send_emails) for entry in previous_results.values())
+            print(f"⏭️  Reanudando desde {ledger.path.name}: {completed} filas ya completadas")
+        else:
+            if resume:
+                print(f"⚠️  No hay campaña previa para reanudar - iniciando una nueva")
+            ledger = CampaignLedger.start(self.form_id)
+            print(f"📒 Ledger de la campaña: {ledger.path.name}")
+        
+        # Stage 2: independent email sender pool fed by the prefill workers
+        dispatcher = None
+        if send_emails:
+            dispatcher = EmailDispatcher(
+                self.send_email,
+                on_result=lambda result_entry: ledger.record('email', result_entry)
+            )
+            print(f"📨 Envíos SMTP simultáneos: {dispatcher.workers}")
+        
+        return ledger, previous_results, dispatcher
+    
+    def _close_campaign(self, ledger, dispatcher):
+        """Drain queued emails, then close SMTP sessions and the ledger"""
+        if dispatcher:
+            pending = dispatcher.pending()
+            if pending:
+                print(f"\n📨 Esperando {pending} emails en cola...")
+            dispatcher.close()
+        self.close_mailer()
+        ledger.close()
+    
+    def _process_rows(self, df, total, send_emails, max_workers, batch_size,
+                      ledger, previous_results, dispatcher):
+        """Process the rows of a DataFrame and return their result entries in row order"""
+        rows = list(df.iterrows())
+        
+        # All submission payloads up front, in one column-wise pass
+        payloads = self.build_payloads(df)
+        
+        # Batch mode: new submissions are created up front, batch_size rows per request
+        batch_results = None
+        if batch_size > 1:
+            batch_results = self._create_prefills_in_batches(
+                rows, batch_size, max_workers, previous_results, payloads
+            )
+        
+        def process(item):
+            idx, row = item
+            return self._process_organization(
+                idx, row, total, send_emails, dispatcher, ledger, previous_results, batch_results, payloads
+            )
+        
+        if max_workers <= 1:
+            return [process(item) for item in rows]
+        
+        # Bounded worker pool; map() yields results in input order
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(process, rows))
+    
     def generate_report(self):
         """Generate comprehensive processing report"""
         print(f"\n📊 Generando reporte final...")
@@ -490,12 +835,12 @@ class PrefillEngineV2:
         
         # Save report
         try:
-            filename = f"../outputs/PREFILL_ENGINE_V2_REPORT_{timestamp}.json"
+            filename = f"../outputs/PREFILL_ENGINE_V2_REPORT_{self.output_tag}{timestamp}.json"
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(report, f, indent=2, ensure_ascii=False)
             
             # Also create Excel report
-            excel_filename = f"../outputs/PREFILL_ENGINE_V2_REPORT_{timestamp}.xlsx"
+            excel_filename = f"../outputs/PREFILL_ENGINE_V2_REPORT_{self.output_tag}{timestamp}.xlsx"
             results_df = pd.DataFrame(self.results)
             results_df.to_excel(excel_filename, index=False)
             
@@ -508,8 +853,8 @@ class PrefillEngineV2:
             print(f"❌ Error generando reporte: {e}")
             return None
     
-    def run_complete_workflow(self, send_emails=False, generate_excel=True):
-        """Run complete prefill workflow"""
+    def run_complete_workflow(self, send_emails=False, generate_excel=True, resume=False, excel_path=None):
+        """Run complete prefill workflow (resume=True skips rows completed by a previous run)"""
         print("=" * 70)
         print("🚀 PREFILL ENGINE V2.0 - SISTEMA COMPLETO CON EXCEL")
         print("=" * 70)
@@ -517,6 +862,8 @@ class PrefillEngineV2:
         print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"📧 Envío de emails: {'ACTIVADO' if send_emails else 'DESACTIVADO'}")
         print(f"📊 Generación Excel: {'ACTIVADO' if generate_excel else 'DESACTIVADO'}")
+        if resume:
+            print(f"⏭️  Modo reanudación: ACTIVADO")
         
         # Step 1: Load clean mapping
         if not self.load_clean_mapping():
@@ -524,12 +871,12 @@ class PrefillEngineV2:
             return False
         
         # Step 2: Load Excel data
-        if not self.load_excel_data():
+        if not self.load_excel_data(excel_path):
             print("\n❌ No se pudieron cargar datos de Excel")
             return False
         
         # Step 3: Process all organizations
-        results = self.process_all_organizations(send_emails=send_emails)
+        results = self.process_all_organizations(send_emails=send_emails, resume=resume)
         
         # Step 4: Generate reports
         report_file = self.generate_report()
@@ -572,8 +919,106 @@ class PrefillEngineV2:
         
         return True
 
+    def run_streaming_workflow(self, send_emails=False, excel_path=None, chunk_size=None, resume=False):
+        """
+        Run the prefill workflow over the input workbook in row chunks
+        
+        Each chunk is read, processed and appended to the reports, LINKS table and email
+        templates before the next one is read, so memory stays flat whatever the input size.
+        Results are not kept in self.results.
+        """
+        if chunk_size is None:
+            chunk_size = EXCEL_CHUNK_SIZE
+        
+        print("=" * 70)
+        print("🚀 PREFILL ENGINE V2.0 - MODO STREAMING POR BLOQUES")
+        print("=" * 70)
+        print(f"Formulario ID: {self.form_id}")
+        print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"📧 Envío de emails: {'ACTIVADO' if send_emails else 'DESACTIVADO'}")
+        print(f"📦 Filas por bloque: {chunk_size}")
+        
+        if not self.load_clean_mapping():
+            print("\n❌ No se pudo cargar mapeo limpio")
+            return False
+        
+        if excel_path is None:
+            excel_path = self.select_excel_file()
+            if excel_path is None:
+                return False
+        
+        try:
+            total, chunks = iter_excel_chunks(excel_path, "📊 DATOS PREFILL", chunk_size)
+        except Exception as e:
+            print(f"❌ Error cargando Excel: {e}")
+            return False
+        
+        print(f"📊 Leyendo {excel_path} por bloques (~{total} filas)...")
+        if total is None:
+            total = '?'
+        
+        ledger, previous_results, dispatcher = self._open_campaign(send_emails, resume)
+        report = PrefillReportStream(self.form_id, output_tag=self.output_tag)
+        outputs = self.excel_generator.open_prefill_stream(self.form_id)
+        excel_columns = 0
+        offset = 0
+        
+        try:
+            for chunk in chunks:
+                chunk = self._drop_metadata_rows(chunk)
+                # Global row numbers: ledger keys, batch results and logs stay unique across chunks
+                chunk.index = range(offset, offset + len(chunk))
+                offset += len(chunk)
+                excel_columns = len(chunk.columns)
+                
+                results = self._process_rows(
+                    chunk, total, send_emails, self.max_workers, self.batch_size,
+                    ledger, previous_results, dispatcher
+                )
+                
+                # Emails of this chunk must be settled before its rows are written out
+                if dispatcher:
+                    dispatcher.wait()
+                
+                report.append(results)
+                outputs.append(results)
+                print(f"\n📦 Bloque escrito: {offset} filas procesadas")
+        finally:
+            self._close_campaign(ledger, dispatcher)
+            report.close({
+                'clean_mapping_fields': len(self.clean_mapping),
+                'excel_columns': excel_columns
+            })
+            outputs.close()
+        
+        print("\n" + "=" * 70)
+        print("✅ PROCESAMIENTO COMPLETADO")
+        print("=" * 70)
+        print(f"📊 RESUMEN FINAL:")
+        print(f"   • Total organizaciones: {report.total}")
+        print(f"   • Prefills exitosos: {report.successful_prefills}")
+        if send_emails:
+            print(f"   • Emails enviados: {report.successful_emails}")
+        print("=" * 70)
+        
+        return True
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Prefill Engine V2.0")
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help="Reanudar la última campaña: omitir filas ya completadas según su ledger en ../outputs"
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=None,
+        help="Procesar el Excel por bloques de N filas (memoria constante para archivos muy grandes)"
+    )
+    args = parser.parse_args()
+    
     engine = PrefillEngineV2()
     
     try:
@@ -593,7 +1038,12 @@ def main():
             send_emails = False
             print("📊 Modo: Solo generando Excel (sin envío de emails)")
         
-        success = engine.run_complete_workflow(send_emails=send_emails, generate_excel=True)
+        if args.chunk_size:
+            success = engine.run_streaming_workflow(
+                send_emails=send_emails, chunk_size=args.chunk_size, resume=args.resume
+            )
+        else:
+            success = engine.run_complete_workflow(send_emails=send_emails, generate_excel=True, resume=args.resume)
         
         if success:
             print(f"\n🎉 ¡PREFILL ENGINE V2.0 EJECUTADO EXITOSAMENTE!")
@@ -604,6 +1054,7 @@ def main():
             
     except KeyboardInterrupt:
         print("\n\n⏸️  Procesamiento cancelado por usuario")
+        print("💡 Los resultados ya procesados están en el ledger; reanudar con --resume")
     except Exception as e:
         print(f"\n❌ Error inesperado: {e}")
 
@@ -0,0 +1,99 @@
+"""
+Prefill Index - Índice local SQLite de prefills creados por organización
+Permite reutilizar o actualizar la submission existente en vez de crear duplicados
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from config import PREFILL_INDEX_DB_PATH
+from company_matcher import normalize_company_name
+
+def organization_key(empresa, nit=None, contact=None):
+    """
+    Identidad estable del prefill: nombre normalizado + NIT (solo dígitos) + contacto
+
+    Cada contacto (email destinatario) de una misma organización tiene su propio prefill.
+    Sin contacto la llave es la de la organización sola.
+    """
+    # NIT numérico leído como float (columna con celdas vacías): 900123.0 -> 900123
+    if isinstance(nit, float) and nit.is_integer():
+        nit = int(nit)
+    nit_digits = ''.join(char for char in str(nit or '') if char.isdigit())
+    raw = f"{normalize_company_name(empresa)}|{nit_digits}"
+    contact = str(contact or '').strip().lower()
+    if contact:
+        raw += f"|{contact}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def prefill_fingerprint(org_key, form_data):
+    """Huella del contenido del prefill: organización + valores mapeados"""
+    raw = json.dumps([org_key, sorted(form_data.items())], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class PrefillIndex:
+    """Índice organización -> (fingerprint, submission) por formulario, seguro entre threads"""
+
+    def __init__(self, db_path=PREFILL_INDEX_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Compartido por los workers del motor: un solo writer a la vez
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS prefill_index (
+                form_id TEXT NOT NULL,
+                org_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                submission_id TEXT NOT NULL,
+                edit_url TEXT NOT NULL,
+                mapped_fields INTEGER,
+                updated_at TEXT,
+                PRIMARY KEY (form_id, org_key)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, form_id, org_key):
+        """Prefill registrado para la organización (dict) o None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT fingerprint, submission_id, edit_url, mapped_fields "
+                "FROM prefill_index WHERE form_id = ? AND org_key = ?",
+                (form_id, org_key)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        fingerprint, submission_id, edit_url, mapped_fields = row
+        return {
+            'fingerprint': fingerprint,
+            'submission_id': submission_id,
+            'edit_url': edit_url,
+            'mapped_fields': mapped_fields
+        }
+
+    def put(self, form_id, org_key, fingerprint, submission_id, edit_url, mapped_fields):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO prefill_index "
+                "(form_id, org_key, fingerprint, submission_id, edit_url, mapped_fields, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(form_id, org_key) DO UPDATE SET "
+                "fingerprint = excluded.fingerprint, submission_id = excluded.submission_id, "
+                "edit_url = excluded.edit_url, mapped_fields = excluded.mapped_fields, "
+                "updated_at = excluded.updated_at",
+                (form_id, org_key, fingerprint, str(submission_id), edit_url, mapped_fields,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
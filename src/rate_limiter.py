@@ -0,0 +1,144 @@
+"""
+Rate Limiter - Token bucket compartido para llamadas a la API de JotForm
+Limita el throughput por la cuota real en vez de pausas fijas entre requests
+"""
+
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from config import JOTFORM_RATE_LIMIT, JOTFORM_RATE_BURST
+
+# Tasa mínima al repartir la cuota indicada por la API (requests/segundo)
+MIN_ADAPTED_RATE = 0.01
+
+class TokenBucketRateLimiter:
+    """Token bucket thread-safe que se ajusta a los headers de rate limit de la API"""
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate: Requests por segundo permitidos en régimen sostenido
+            burst: Máximo de requests que se pueden emitir de golpe
+        """
+        if not float(rate) > 0:
+            raise ValueError(f"La tasa del rate limiter debe ser mayor que 0 (recibido: {rate})")
+
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.burst = max(1, int(burst))
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._rate_override_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Recargar tokens según el tiempo transcurrido"""
+        # Restaurar la tasa configurada cuando expira la ventana indicada por la API
+        if self._rate_override_until and now >= self._rate_override_until:
+            self.rate = self.max_rate
+            self._rate_override_until = 0.0
+
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Bloquear hasta que haya un token disponible y consumirlo"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """Ajustar el limitador según los headers de rate limit de la respuesta (si existen)"""
+        if not headers:
+            return
+
+        retry_after = self.parse_retry_after(headers.get('Retry-After'))
+        remaining = self._parse_number(headers.get('X-RateLimit-Remaining'))
+        reset_in = self._parse_reset(headers.get('X-RateLimit-Reset'))
+
+        with self._lock:
+            now = time.monotonic()
+
+            # La API pide esperar explícitamente
+            if retry_after is not None:
+                self._block(now, retry_after)
+                return
+
+            if remaining is None or reset_in is None:
+                return
+
+            if remaining <= 0:
+                # Cuota agotada: nadie emite hasta que se reinicie la ventana
+                self._block(now, reset_in)
+            elif reset_in > 0:
+                # Repartir la cuota restante en lo que queda de ventana, sin superar la tasa configurada
+                self.rate = min(self.max_rate, max(remaining / reset_in, MIN_ADAPTED_RATE))
+                self._rate_override_until = now + reset_in
+
+    def _block(self, now, seconds):
+        """Pausar todas las emisiones durante `seconds`"""
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = 0.0
+        self._last_refill = self._blocked_until
+
+    @staticmethod
+    def _parse_number(value):
+        """Número del header; None si falta o no es finito ('nan', 'inf')"""
+        try:
+            number = float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+        return number if number is not None and math.isfinite(number) else None
+
+    @classmethod
+    def _parse_reset(cls, value):
+        """X-RateLimit-Reset puede venir como segundos restantes o como epoch"""
+        reset = cls._parse_number(value)
+        if reset is None:
+            return None
+        if reset > 1_000_000_000:
+            reset -= time.time()
+        return max(0.0, reset)
+
+    @classmethod
+    def parse_retry_after(cls, value):
+        """Retry-After puede venir en segundos o como fecha HTTP"""
+        if value is None:
+            return None
+
+        seconds = cls._parse_number(value)
+        if seconds is not None:
+            return max(0.0, seconds)
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+def get_shared_rate_limiter():
+    """Limitador único compartido por todas las clases que llaman a la API de JotForm"""
+    global _shared_limiter
+
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucketRateLimiter(JOTFORM_RATE_LIMIT, JOTFORM_RATE_BURST)
+        return _shared_limiter
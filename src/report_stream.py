@@ -0,0 +1,88 @@
+"""
+Report Stream - Reporte del motor de prefill (JSON + Excel) escrito por bloques
+Los resultados se escriben a disco a medida que llegan; solo se guardan los totales
+"""
+
+import json
+import textwrap
+from datetime import datetime
+from pathlib import Path
+
+from openpyxl.styles import Font, Alignment
+
+from excel_stream_writer import StreamingExcelWriter
+
+class PrefillReportStream:
+    """Mismo contenido que PrefillEngineV2.generate_report, con memoria constante"""
+
+    def __init__(self, form_id, output_dir=Path("../outputs"), output_tag=""):
+        self.form_id = form_id
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.json_path = Path(output_dir) / f"PREFILL_ENGINE_V2_REPORT_{output_tag}{self.timestamp}.json"
+        self.excel_path = Path(output_dir) / f"PREFILL_ENGINE_V2_REPORT_{output_tag}{self.timestamp}.xlsx"
+
+        self.total = 0
+        self.successful_prefills = 0
+        self.successful_emails = 0
+
+        # detailed_results va primero: es lo único que se conoce antes del final
+        self.json_file = open(self.json_path, 'w', encoding='utf-8')
+        self.json_file.write('{\n  "detailed_results": [')
+
+        self.writer = StreamingExcelWriter(self.excel_path)
+        self.sheet = self.writer.add_sheet('Sheet1')
+        self.columns = None
+
+    def append(self, results_data):
+        """Agregar un bloque de resultados"""
+        for result in results_data:
+            if self.columns is None:
+                self.columns = list(result)
+                self.sheet.write_header(
+                    self.columns,
+                    font=Font(bold=True),
+                    alignment=Alignment(horizontal="center", vertical="top")
+                )
+
+            separator = ',\n' if self.total else '\n'
+            entry = json.dumps(result, indent=2, ensure_ascii=False, default=str)
+            self.json_file.write(separator + textwrap.indent(entry, '    '))
+
+            self.sheet.append([result.get(column) for column in self.columns])
+
+            self.total += 1
+            self.successful_prefills += bool(result.get('prefill_success'))
+            self.successful_emails += bool(result.get('email_success'))
+
+    def close(self, configuration=None):
+        """Cerrar el arreglo de resultados y escribir metadata, resumen y configuración"""
+        total_orgs = self.total
+        tail = {
+            'metadata': {
+                'timestamp': self.timestamp,
+                'form_id': self.form_id,
+                'total_organizations_processed': total_orgs,
+                'engine_version': '2.0'
+            },
+            'summary': {
+                'successful_prefills': self.successful_prefills,
+                'successful_emails': self.successful_emails,
+                'failed_prefills': total_orgs - self.successful_prefills,
+                'failed_emails': total_orgs - self.successful_emails,
+                'success_rate_prefill': round(self.successful_prefills / total_orgs * 100, 1) if total_orgs > 0 else 0,
+                'success_rate_email': round(self.successful_emails / total_orgs * 100, 1) if total_orgs > 0 else 0
+            },
+            'configuration': configuration or {}
+        }
+
+        # Continuar el mismo objeto JSON: quitar la llave de apertura del resto del reporte
+        rest = json.dumps(tail, indent=2, ensure_ascii=False)
+        self.json_file.write('\n  ],\n' + rest[2:])
+        self.json_file.close()
+
+        self.writer.save()
+
+        print(f"✅ Reporte JSON: {self.json_path}")
+        print(f"✅ Reporte Excel: {self.excel_path}")
+
+        return self.json_path
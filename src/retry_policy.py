@@ -0,0 +1,156 @@
+"""
+Retry Policy - Reintentos con backoff exponencial y circuit breaker para la API de JotForm
+Absorbe 429/5xx transitorios sin tormentas de reintentos: jitter, Retry-After y pausa global
+"""
+
+import random
+import threading
+import time
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from config import (
+    JOTFORM_MAX_RETRIES, JOTFORM_RETRY_BASE_DELAY, JOTFORM_RETRY_MAX_DELAY,
+    JOTFORM_CIRCUIT_FAILURE_THRESHOLD, JOTFORM_CIRCUIT_RESET_TIMEOUT
+)
+from rate_limiter import TokenBucketRateLimiter
+
+# Respuestas transitorias: cuentan como falla del API para el circuit breaker
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+# POST/PUT crean submissions: solo se reintentan si el API seguro no procesó el request
+NON_IDEMPOTENT_RETRY_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+def is_connect_error(exc):
+    """True si el request nunca llegó al servidor (no se pudo abrir la conexión)"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError) and exc.args:
+        reason = getattr(exc.args[0], 'reason', None) if isinstance(exc.args[0], MaxRetryError) else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+def is_transient_error(exc):
+    return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+class RetryPolicy:
+    """Decide si un request se reintenta y cuánto esperar (full jitter + Retry-After)"""
+
+    def __init__(self, max_retries=JOTFORM_MAX_RETRIES, base_delay=JOTFORM_RETRY_BASE_DELAY,
+                 max_delay=JOTFORM_RETRY_MAX_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, method, attempt, response=None, exc=None):
+        """
+        Args:
+            attempt: Reintentos ya hechos (0 en el primer intento)
+            response: Respuesta recibida (o None si hubo excepción)
+            exc: Excepción de requests (o None)
+        """
+        if attempt >= self.max_retries:
+            return False
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        if exc is not None:
+            # Sin respuesta: un POST pudo haberse procesado, salvo que nunca se conectara
+            return is_transient_error(exc) if idempotent else is_connect_error(exc)
+
+        statuses = TRANSIENT_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+        return response.status_code in statuses
+
+    def delay(self, attempt, response=None):
+        """Backoff exponencial con full jitter; nunca menos que el Retry-After del API"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+        if response is not None:
+            retry_after = TokenBucketRateLimiter.parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return max(backoff, min(retry_after, self.max_delay))
+
+        return backoff
+
+class CircuitBreaker:
+    """
+    Pausa a todos los workers mientras el API está fallando
+
+    Tras `failure_threshold` fallas transitorias seguidas el circuito se abre: nadie emite
+    requests durante `reset_timeout` segundos. Luego pasa un único request de prueba;
+    si funciona el circuito se cierra, si falla se vuelve a abrir.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=JOTFORM_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=JOTFORM_CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_until = 0.0
+        self._trial_in_flight = False
+        self._cond = threading.Condition()
+
+    def before_request(self):
+        """
+        Bloquear mientras el circuito esté abierto o haya un request de prueba en curso
+
+        Returns:
+            True si este request es el de prueba: quien lo emite debe cerrar el turno con
+            record_success/record_failure o, si no hubo resultado, con release_trial
+        """
+        with self._cond:
+            while True:
+                if self.state == self.CLOSED:
+                    return False
+
+                now = time.monotonic()
+
+                if self.state == self.OPEN:
+                    if now < self._opened_until:
+                        self._cond.wait(self._opened_until - now)
+                        continue
+                    self.state = self.HALF_OPEN
+
+                # Half-open: solo un request de prueba a la vez
+                if not self._trial_in_flight:
+                    self._trial_in_flight = True
+                    return True
+                self._cond.wait(self.reset_timeout)
+
+    def release_trial(self):
+        """Liberar el turno de prueba sin veredicto (el circuito sigue medio abierto)"""
+        with self._cond:
+            self._trial_in_flight = False
+            self._cond.notify_all()
+
+    def record_success(self):
+        with self._cond:
+            if self.state != self.CLOSED:
+                print("   🟢 API de JotForm disponible de nuevo - reanudando requests")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self._failures += 1
+            self._trial_in_flight = False
+
+            # Requests que ya estaban en vuelo al abrirse no extienden la pausa
+            if self.state != self.OPEN and (
+                self.state == self.HALF_OPEN or self._failures >= self.failure_threshold
+            ):
+                print(f"   🔴 API de JotForm fallando - pausando requests {self.reset_timeout:g}s")
+                self.state = self.OPEN
+                self._opened_until = time.monotonic() + self.reset_timeout
+
+            self._cond.notify_all()
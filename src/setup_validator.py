@@ -8,6 +8,8 @@ import sys
 import json
 from datetime import datetime
 from config import JOTFORM_API_KEY, FORM_ID
+from jotform_client import get_jotform_client
+from form_schema_cache import get_form_schema_cache
 
 class JotFormSetupValidator:
     """Validates JotForm API setup and configuration"""
@@ -15,8 +17,7 @@ class JotFormSetupValidator:
     def __init__(self):
         self.api_key = JOTFORM_API_KEY
         self.form_id = FORM_ID
-        self.base_url = "https://api.jotform.com"
-        self.headers = {"APIKEY": self.api_key}
+        self.client = get_jotform_client()
         self.results = {}
     
     def validate_config(self):
@@ -39,8 +40,7 @@ class JotFormSetupValidator:
         print("\n🌐 Probando conexión API...")
         
         try:
-            url = f"{self.base_url}/user"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.client.get("/user", timeout=10)
             data = response.json()
             
             if response.status_code == 200 and data.get('responseCode') == 200:
@@ -65,8 +65,7 @@ class JotFormSetupValidator:
         print(f"\n📋 Validando acceso al formulario {self.form_id}...")
         
         try:
-            url = f"{self.base_url}/form/{self.form_id}"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.client.get(f"/form/{self.form_id}", timeout=10)
             data = response.json()
             
             if response.status_code == 200 and data.get('responseCode') == 200:
@@ -92,31 +91,27 @@ class JotFormSetupValidator:
         print(f"\n📊 Obteniendo estadísticas del formulario...")
         
         try:
-            # Get form questions
-            url = f"{self.base_url}/form/{self.form_id}/questions"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            # Get form questions (shared structure cache)
+            questions = get_form_schema_cache().get_questions(self.form_id, timeout=10)
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('responseCode') == 200:
-                    questions = data.get('content', {})
-                    print(f"✅ Total de campos: {len(questions)}")
-                    
-                    # Count field types
-                    field_types = {}
-                    for q in questions.values():
-                        field_type = q.get('type', 'unknown')
-                        field_types[field_type] = field_types.get(field_type, 0) + 1
-                    
-                    print("   Tipos de campos:")
-                    for field_type, count in sorted(field_types.items()):
-                        print(f"   - {field_type}: {count}")
-                    
-                    self.results['form_statistics'] = {
-                        'total_fields': len(questions),
-                        'field_types': field_types
-                    }
-                    return True
+            if questions is not None:
+                print(f"✅ Total de campos: {len(questions)}")
+                
+                # Count field types
+                field_types = {}
+                for q in questions.values():
+                    field_type = q.get('type', 'unknown')
+                    field_types[field_type] = field_types.get(field_type, 0) + 1
+                
+                print("   Tipos de campos:")
+                for field_type, count in sorted(field_types.items()):
+                    print(f"   - {field_type}: {count}")
+                
+                self.results['form_statistics'] = {
+                    'total_fields': len(questions),
+                    'field_types': field_types
+                }
+                return True
             
             print("⚠️  No se pudieron obtener estadísticas")
             return False
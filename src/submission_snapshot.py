@@ -0,0 +1,170 @@
+"""
+Submission Snapshot - Snapshots columnares (Parquet) de las submissions del monitor
+Tabla larga (submission_id, qid, answer) y tabla ancha, particionadas por fecha de ejecución
+"""
+
+import json
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Sin pyarrow no hay snapshots; el monitor sigue solo con Excel
+    pq = None
+
+SNAPSHOT_DIR = Path("../outputs/snapshots")
+
+# Columnas de la tabla ancha antes de las preguntas
+WIDE_BASE_COLUMNS = [
+    'submission_id', 'empresa', 'tipo_organizacion', 'tipo_submission',
+    'estado', 'fecha_respuesta', 'fecha_actualizacion'
+]
+
+def answer_text(answer):
+    """Respuesta de JotForm como texto plano (listas unidas, dicts como JSON)"""
+    if isinstance(answer, list):
+        return ' '.join(str(item) for item in answer)
+    if isinstance(answer, dict):
+        return json.dumps(answer, ensure_ascii=False, sort_keys=True)
+    return str(answer).strip()
+
+def _partition_dir(snapshot_dir, kind, form_id, run_date):
+    """Partición estilo Hive: {kind}/form_id=.../run_date=YYYY-MM-DD"""
+    return Path(snapshot_dir) / kind / f"form_id={form_id}" / f"run_date={run_date}"
+
+class SubmissionSnapshotWriter:
+    """
+    Escribe las submissions procesadas por FormMonitorV2 como Parquet, por bloques
+
+    Cada bloque es un row group: las respuestas no se acumulan en memoria. La partición
+    del día se reemplaza de forma atómica al cerrar (una ejecución el mismo día reemplaza
+    la anterior).
+    """
+
+    def __init__(self, form_id, question_plan, snapshot_dir=SNAPSHOT_DIR, run_date=None):
+        """
+        Args:
+            question_plan: Lista (qid, nombre de columna) de las preguntas con respuesta
+        """
+        if pq is None:
+            raise ImportError("pyarrow es necesario para los snapshots Parquet")
+
+        self.form_id = form_id
+        self.snapshot_dir = Path(snapshot_dir)
+        self.run_date = (run_date or date.today()).isoformat()
+        # Tabla ancha: una columna por pregunta del plan, nombrada por su qid
+        self.plan_qids = list(dict.fromkeys(qid for qid, _ in question_plan))
+
+        self.schemas = {
+            'long': pa.schema([(column, pa.string()) for column in ('submission_id', 'qid', 'answer')]),
+            'wide': pa.schema([(column, pa.string()) for column in WIDE_BASE_COLUMNS + self.plan_qids])
+        }
+        # kind -> (ParquetWriter, archivo temporal, archivo final)
+        self._writers = {}
+
+    def _write(self, kind, columns):
+        if kind not in self._writers:
+            partition_dir = _partition_dir(self.snapshot_dir, kind, self.form_id, self.run_date)
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = partition_dir / "snapshot.parquet.tmp"
+            self._writers[kind] = (pq.ParquetWriter(tmp_file, self.schemas[kind]), tmp_file, partition_dir / "snapshot.parquet")
+
+        self._writers[kind][0].write_table(pa.table(columns, schema=self.schemas[kind]))
+
+    def append(self, processed_submissions):
+        """
+        Agregar un bloque de submissions
+
+        Args:
+            processed_submissions: Bloque de FormMonitorV2.process_submissions, con 'answers'
+        """
+        # Tabla larga: todas las respuestas no vacías, una fila por (submission, pregunta)
+        long_ids, long_qids, long_answers = [], [], []
+        wide_columns = {column: [] for column in WIDE_BASE_COLUMNS}
+        wide_columns.update({qid: [] for qid in self.plan_qids})
+
+        for submission in processed_submissions:
+            submission_id = str(submission['submission_id'])
+            texts = {}
+
+            for qid, answer_data in submission['answers'].items():
+                answer = answer_data.get('answer') if isinstance(answer_data, dict) else None
+                if answer in (None, '', [], {}):
+                    continue
+                texts[qid] = answer_text(answer)
+                long_ids.append(submission_id)
+                long_qids.append(str(qid))
+                long_answers.append(texts[qid])
+
+            for column in WIDE_BASE_COLUMNS:
+                value = submission.get(column)
+                wide_columns[column].append(None if value is None else str(value))
+            for qid in self.plan_qids:
+                wide_columns[qid].append(texts.get(qid))
+
+        self._write('long', {'submission_id': long_ids, 'qid': long_qids, 'answer': long_answers})
+        self._write('wide', wide_columns)
+
+    def close(self):
+        """
+        Terminar los archivos y publicarlos en la partición del día
+
+        Returns:
+            (ruta tabla larga, ruta tabla ancha)
+        """
+        if not self._writers:
+            # Sin submissions: tablas vacías con su esquema
+            self.append([])
+
+        paths = {}
+        for kind, (writer, tmp_file, target) in self._writers.items():
+            writer.close()
+            tmp_file.replace(target)
+            paths[kind] = target
+        self._writers = {}
+
+        return paths['long'], paths['wide']
+
+    def abort(self):
+        """Descartar lo escrito; la partición anterior queda intacta"""
+        for writer, tmp_file, _ in self._writers.values():
+            try:
+                writer.close()
+            finally:
+                tmp_file.unlink(missing_ok=True)
+        self._writers = {}
+
+def list_snapshot_dates(form_id, kind='wide', snapshot_dir=SNAPSHOT_DIR):
+    """Fechas de ejecución con snapshot para el formulario (ascendentes)"""
+    form_dir = Path(snapshot_dir) / kind / f"form_id={form_id}"
+    if not form_dir.exists():
+        return []
+    return sorted(
+        partition.name.split('=', 1)[1]
+        for partition in form_dir.glob("run_date=*")
+        if (partition / "snapshot.parquet").exists()
+    )
+
+def load_snapshot(form_id, kind='wide', run_date=None, columns=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Cargar un snapshot como DataFrame (None si no existe)
+
+    Args:
+        kind: 'long' o 'wide'
+        run_date: Fecha 'YYYY-MM-DD'; por defecto la más reciente
+        columns: Leer solo estas columnas (Parquet es columnar: el resto no se lee)
+    """
+    if run_date is None:
+        dates = list_snapshot_dates(form_id, kind, snapshot_dir)
+        if not dates:
+            return None
+        run_date = dates[-1]
+
+    snapshot_file = _partition_dir(snapshot_dir, kind, form_id, run_date) / "snapshot.parquet"
+    if not snapshot_file.exists():
+        return None
+
+    return pd.read_parquet(snapshot_file, columns=columns)
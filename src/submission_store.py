@@ -0,0 +1,164 @@
+"""
+Submission Store - Almacén local SQLite de submissions de JotForm
+Permite sincronización incremental usando un watermark de created_at/updated_at
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from config import SUBMISSIONS_DB_PATH
+
+class SubmissionStore:
+    """Almacén persistente de submissions con watermark de sincronización por formulario"""
+
+    def __init__(self, db_path=SUBMISSIONS_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Varios monitores (multi-formulario) escriben al mismo archivo: esperar el lock
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                form_id TEXT NOT NULL,
+                submission_id TEXT NOT NULL,
+                created_at TEXT,
+                updated_at TEXT,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (form_id, submission_id)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                form_id TEXT PRIMARY KEY,
+                watermark TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reconcile_state (
+                form_id TEXT PRIMARY KEY,
+                reconciled_at TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def get_watermark(self, form_id):
+        """Último created_at/updated_at sincronizado para el formulario (None si nunca)"""
+        row = self.conn.execute(
+            "SELECT watermark FROM sync_state WHERE form_id = ?", (form_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, form_id, watermark):
+        self.conn.execute(
+            "INSERT INTO sync_state (form_id, watermark) VALUES (?, ?) "
+            "ON CONFLICT(form_id) DO UPDATE SET watermark = excluded.watermark",
+            (form_id, watermark)
+        )
+        self.conn.commit()
+
+    def get_reconciled_at(self, form_id):
+        """Fecha (datetime) de la última reconciliación completa de ids (None si nunca)"""
+        row = self.conn.execute(
+            "SELECT reconciled_at FROM reconcile_state WHERE form_id = ?", (form_id,)
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def set_reconciled_at(self, form_id, reconciled_at):
+        self.conn.execute(
+            "INSERT INTO reconcile_state (form_id, reconciled_at) VALUES (?, ?) "
+            "ON CONFLICT(form_id) DO UPDATE SET reconciled_at = excluded.reconciled_at",
+            (form_id, reconciled_at.isoformat(timespec='seconds'))
+        )
+        self.conn.commit()
+
+    def upsert_submissions(self, form_id, submissions):
+        """
+        Insertar o actualizar submissions; retorna (nuevas, modificadas o borradas, timestamp más reciente)
+
+        Una submission ya guardada con el mismo contenido no cuenta: la sincronización
+        vuelve a traer las del segundo del watermark. Las que llegan con status DELETED
+        (borradas en JotForm) se quitan del almacén.
+        """
+        rows = []
+        deleted = []
+        latest = None
+
+        for submission in submissions:
+            created_at = submission.get('created_at')
+            updated_at = submission.get('updated_at')
+
+            for timestamp in (created_at, updated_at):
+                if timestamp and (latest is None or timestamp > latest):
+                    latest = timestamp
+
+            if submission.get('status') == 'DELETED':
+                deleted.append((form_id, str(submission.get('id'))))
+                continue
+
+            rows.append((
+                form_id,
+                str(submission.get('id')),
+                created_at,
+                updated_at,
+                json.dumps(submission, ensure_ascii=False)
+            ))
+
+        changes_before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT INTO submissions "
+            "(form_id, submission_id, created_at, updated_at, payload) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(form_id, submission_id) DO UPDATE SET "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, payload = excluded.payload "
+            "WHERE submissions.payload != excluded.payload",
+            rows
+        )
+        self.conn.executemany(
+            "DELETE FROM submissions WHERE form_id = ? AND submission_id = ?", deleted
+        )
+        self.conn.commit()
+
+        return self.conn.total_changes - changes_before, latest
+
+    def prune_missing(self, form_id, current_ids):
+        """
+        Quitar las submissions que ya no están en JotForm
+
+        Args:
+            current_ids: Todos los ids de un listado completo del formulario
+        Returns:
+            Cantidad de submissions eliminadas
+        """
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_ids (submission_id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM current_ids")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO current_ids (submission_id) VALUES (?)",
+            ((str(submission_id),) for submission_id in current_ids)
+        )
+        cursor = self.conn.execute(
+            "DELETE FROM submissions WHERE form_id = ? "
+            "AND submission_id NOT IN (SELECT submission_id FROM current_ids)",
+            (form_id,)
+        )
+        self.conn.execute("DELETE FROM current_ids")
+        self.conn.commit()
+        return cursor.rowcount
+
+    def count(self, form_id):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM submissions WHERE form_id = ?", (form_id,)
+        ).fetchone()[0]
+
+    def iter_submissions(self, form_id):
+        """Recorrer las submissions almacenadas (más recientes primero, como el API)"""
+        cursor = self.conn.execute(
+            "SELECT payload FROM submissions WHERE form_id = ? "
+            "ORDER BY created_at DESC, submission_id DESC",
+            (form_id,)
+        )
+        for (payload,) in cursor:
+            yield json.loads(payload)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,216 @@
+"""
+Tests del modo batch del motor de prefill (PUT /form/{id}/submissions)
+Un servidor HTTP local hace de API de JotForm: no se usa la red ni la API real
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+# config.py exige estas variables al importarse; el índice de prefills va a un directorio temporal
+os.environ.setdefault('JOTFORM_API_KEY', 'test-key')
+os.environ.setdefault('FORM_ID', '123')
+os.environ.setdefault('GMAIL_USER', 'test@example.com')
+os.environ.setdefault('GMAIL_PASSWORD', 'test')
+os.environ.setdefault('PREFILL_INDEX_DB_PATH', str(Path(tempfile.mkdtemp()) / "prefill_index.db"))
+
+from jotform_client import JotFormClient  # noqa: E402
+from prefill_engine_v2 import PrefillEngineV2  # noqa: E402
+from prefill_index import PrefillIndex  # noqa: E402
+from rate_limiter import TokenBucketRateLimiter  # noqa: E402
+
+FORM_ID = '123'
+
+class StubJotForm:
+    """Estado del servidor falso: submissions creadas, requests recibidos y respuesta del PUT"""
+
+    def __init__(self):
+        self.submissions = {}
+        self.calls = []
+        # None: el batch se crea y se responde 200; (status, body): respuesta fija
+        self.put_response = None
+        # El PUT crea las submissions antes de responder con put_response
+        self.put_creates = False
+        # Segundos que tarda cada POST (ensancha la ventana de carreras entre workers)
+        self.post_delay = 0
+        self._next_id = 1000
+        self._lock = threading.Lock()
+
+    def create(self, answers):
+        with self._lock:
+            submission_id = str(self._next_id)
+            self._next_id += 1
+            self.submissions[submission_id] = answers
+            return submission_id
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length).decode('utf-8')
+
+            def _send(self, status, body, content_type='application/json'):
+                raw = body.encode('utf-8') if isinstance(body, str) else json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_PUT(self):
+                items = json.loads(self._read_body())
+                stub.calls.append(('PUT', urlparse(self.path).path))
+
+                if stub.put_response is not None and not stub.put_creates:
+                    return self._send(*stub.put_response)
+
+                content = [
+                    {'submissionID': stub.create(item), 'URL': 'https://www.jotform.com/submission/x'}
+                    for item in items
+                ]
+                if stub.put_response is not None:
+                    return self._send(*stub.put_response)
+                self._send(200, {'responseCode': 200, 'content': content})
+
+            def do_POST(self):
+                form = parse_qs(self._read_body())
+                stub.calls.append(('POST', urlparse(self.path).path))
+                answers = {key[len('submission['):-1]: values[0] for key, values in form.items()}
+                time.sleep(stub.post_delay)
+                submission_id = stub.create(answers)
+                self._send(200, {'responseCode': 200, 'content': {'submissionID': submission_id}})
+
+        return Handler
+
+@pytest.fixture
+def stub():
+    stub = StubJotForm()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), stub.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def engine(stub, tmp_path):
+    engine = PrefillEngineV2(FORM_ID)
+    engine.client = JotFormClient(
+        api_key='test-key', base_url=stub.base_url, rate_limiter=TokenBucketRateLimiter(1000, 100)
+    )
+    engine.prefill_index.close()
+    engine.prefill_index = PrefillIndex(tmp_path / "prefill_index.db")
+    engine.clean_mapping = {'Nombre Empresa/Organización': '7', 'Sector': '8'}
+    yield engine
+    engine.prefill_index.close()
+
+def make_rows(count):
+    df = pd.DataFrame({
+        'Nombre Empresa/Organización': [f'Empresa {i}' for i in range(count)],
+        'NIT': [str(900000 + i) for i in range(count)],
+        'Sector': ['Agro'] * count,
+        'Email Destinatario': [f'contacto{i}@empresa.co' for i in range(count)]
+    })
+    return list(df.iterrows())
+
+def create_in_batches(engine, rows, batch_size):
+    return engine._create_prefills_in_batches(rows, batch_size=batch_size, max_workers=2)
+
+def test_batch_200_creates_all_rows_with_one_put_per_batch(engine, stub):
+    rows = make_rows(5)
+
+    results = create_in_batches(engine, rows, batch_size=2)
+
+    assert [method for method, _ in stub.calls] == ['PUT'] * 3
+    assert sorted(results) == [idx for idx, _ in rows]
+    for idx, row in rows:
+        result = results[idx]
+        assert result['success'] and result['action'] == 'created'
+        # Las submissions devueltas se asocian a su fila en orden
+        assert stub.submissions[result['submission_id']]['7'] == row['Nombre Empresa/Organización']
+        assert engine.prefill_index.get(FORM_ID, engine._organization_key(row))['submission_id'] == result['submission_id']
+
+    # Re-ejecución: todas las filas ya están en el índice, no hay requests nuevos
+    assert create_in_batches(engine, rows, batch_size=2) == {}
+    assert len(stub.calls) == 3
+
+def test_batch_4xx_falls_back_to_one_post_per_row(engine, stub):
+    stub.put_response = (400, {'responseCode': 400, 'message': 'bad batch'})
+    rows = make_rows(3)
+
+    results = create_in_batches(engine, rows, batch_size=3)
+
+    assert [method for method, _ in stub.calls] == ['PUT', 'POST', 'POST', 'POST']
+    assert all(results[idx]['success'] for idx, _ in rows)
+    assert len(stub.submissions) == 3
+
+@pytest.mark.parametrize('response', [
+    (500, {'responseCode': 500, 'message': 'internal error'}),
+    (502, '<html>Bad Gateway</html>'),
+])
+def test_batch_5xx_marks_rows_failed_without_reposting(engine, stub, response):
+    # El servidor alcanzó a crear el batch antes de fallar: repostear lo duplicaría
+    stub.put_response = response if isinstance(response[1], dict) else (*response, 'text/html')
+    stub.put_creates = True
+    rows = make_rows(3)
+
+    results = create_in_batches(engine, rows, batch_size=3)
+
+    assert [method for method, _ in stub.calls] == ['PUT']
+    assert len(stub.submissions) == 3
+    assert not any(results[idx]['success'] for idx, _ in rows)
+    assert all('Batch sin confirmar' in results[idx]['error'] for idx, _ in rows)
+    assert all(engine.prefill_index.get(FORM_ID, engine._organization_key(row)) is None for _, row in rows)
+
+def test_contacts_of_the_same_organization_get_their_own_prefill(engine, stub):
+    rows = make_rows(1)
+    second_contact = rows[0][1].copy()
+    second_contact['Email Destinatario'] = 'otro.contacto@empresa.co'
+    rows.append((1, second_contact))
+
+    results = create_in_batches(engine, rows, batch_size=2)
+
+    assert results[0]['success'] and results[1]['success']
+    assert results[0]['submission_id'] != results[1]['submission_id']
+    assert engine._organization_key(rows[0][1]) != engine._organization_key(rows[1][1])
+
+def test_concurrent_rows_with_the_same_key_create_one_submission(engine, stub):
+    stub.post_delay = 0.2
+    _, row = make_rows(1)[0]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: engine.create_prefill_submission(row), range(4)))
+
+    assert [method for method, _ in stub.calls] == ['POST']
+    assert sorted(result['action'] for result in results) == ['created', 'reused', 'reused', 'reused']
+    assert len({result['submission_id'] for result in results}) == 1
+
+def test_duplicate_key_rows_are_batched_once(engine, stub):
+    rows = make_rows(2)
+    rows.append((2, rows[0][1].copy()))
+
+    results = create_in_batches(engine, rows, batch_size=5)
+
+    assert sorted(results) == [0, 1]
+    assert len(stub.submissions) == 2
@@ -0,0 +1,52 @@
+"""
+Tests del almacén local de submissions: borradas en JotForm y reconciliación de ids
+"""
+
+import os
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+# config.py exige estas variables al importarse
+os.environ.setdefault('JOTFORM_API_KEY', 'test-key')
+os.environ.setdefault('FORM_ID', '123')
+os.environ.setdefault('GMAIL_USER', 'test@example.com')
+os.environ.setdefault('GMAIL_PASSWORD', 'test')
+
+from submission_store import SubmissionStore  # noqa: E402
+
+FORM_ID = '123'
+
+def submission(submission_id, status='ACTIVE'):
+    return {
+        'id': submission_id,
+        'status': status,
+        'created_at': '2026-01-01 10:00:00',
+        'updated_at': None
+    }
+
+def stored_ids(store):
+    return sorted(item['id'] for item in store.iter_submissions(FORM_ID))
+
+def test_deleted_status_removes_the_submission(tmp_path):
+    store = SubmissionStore(tmp_path / "store.db")
+    store.upsert_submissions(FORM_ID, [submission('1'), submission('2')])
+
+    changed, _ = store.upsert_submissions(FORM_ID, [submission('2', status='DELETED')])
+
+    assert changed == 1
+    assert stored_ids(store) == ['1']
+    store.close()
+
+def test_prune_missing_keeps_only_listed_ids(tmp_path):
+    store = SubmissionStore(tmp_path / "store.db")
+    store.upsert_submissions(FORM_ID, [submission('1'), submission('2'), submission('3')])
+    store.upsert_submissions('otro', [submission('9')])
+
+    assert store.prune_missing(FORM_ID, ['1', '3']) == 1
+    assert stored_ids(store) == ['1', '3']
+    # Solo se reconcilia el formulario indicado
+    assert store.count('otro') == 1
+    store.close()